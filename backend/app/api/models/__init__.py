@@ -1,4 +1,3 @@
-from .database import User, Connection, Pipeline, PipelineRun
-
-__all__ = ["User", "Connection", "Pipeline", "PipelineRun"]
+from .database import User, Connection, Pipeline, PipelineRun, Tenant, Project, Contract
 
+__all__ = ["User", "Connection", "Pipeline", "PipelineRun", "Tenant", "Project", "Contract"]
@@ -1,9 +1,14 @@
 """Pydantic models for ingestion contract validation."""
-from pydantic import BaseModel, Field, validator
+import re
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr, TypeAdapter, validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
 
+# Valid Snowflake unquoted identifier: letter/underscore followed by alphanumerics/underscores
+_COLUMN_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*\Z')
+
 
 class FileFormat(str, Enum):
     CSV = "CSV"
@@ -16,8 +21,24 @@ class IngestionType(str, Enum):
     SNOWPIPE = "snowpipe"
 
 
+_SOURCE_TYPES = frozenset({"s3"})
+_SUPPORTED_VERSIONS = frozenset({"1.0"})
+_ENVIRONMENTS = frozenset({"dev", "uat", "prod"})
+
+# Nested sections are immutable once validated, so parents can reuse them without copying
+_SECTION_CONFIG = ConfigDict(frozen=True, revalidate_instances="never")
+
+
+@lru_cache(maxsize=32)
+def get_type_adapter(tp: Any) -> TypeAdapter:
+    """Get a cached TypeAdapter for a type (adapters are expensive to build)."""
+    return TypeAdapter(tp)
+
+
 class ColumnSchema(BaseModel):
     """Schema for a single table column."""
+    model_config = _SECTION_CONFIG
+
     name: str = Field(..., description="Column name")
     type: str = Field(..., description="Snowflake data type (VARCHAR, NUMBER, VARIANT, TIMESTAMP_NTZ, etc.)")
     nullable: bool = Field(default=True, description="Whether the column is nullable")
@@ -25,24 +46,31 @@ class ColumnSchema(BaseModel):
     @validator('name')
     def validate_column_name(cls, v):
         """Ensure column name is a valid Snowflake identifier."""
-        if not v or not v.strip():
+        name = v.strip() if v else ""
+        if not name:
             raise ValueError("Column name cannot be empty")
-        # Basic validation - should be alphanumeric with underscores
-        if not all(c.isalnum() or c == '_' for c in v):
+        if not _COLUMN_NAME_RE.match(name):
+            if name[0].isdigit():
+                raise ValueError("Column name cannot start with a digit")
             raise ValueError("Column name must contain only alphanumeric characters and underscores")
-        if v[0].isdigit():
-            raise ValueError("Column name cannot start with a digit")
-        return v.strip()
+        return name
+
+
+_COLUMN_LIST_ADAPTER = get_type_adapter(List[ColumnSchema])
 
 
 class EnvironmentSourceConfig(BaseModel):
     """Source configuration for a specific environment."""
+    model_config = _SECTION_CONFIG
+
     connection_name: str = Field(..., description="Connection name for this environment")
     bucket: str = Field(..., description="S3 bucket name for this environment")
 
 
 class EnvironmentTargetConfig(BaseModel):
     """Target configuration for a specific environment."""
+    model_config = _SECTION_CONFIG
+
     connection_name: str = Field(..., description="Snowflake connection name for this environment")
     database: str = Field(..., description="Target database for this environment")
     schema_name: str = Field(..., alias="schema", description="Target schema for this environment")
@@ -50,6 +78,8 @@ class EnvironmentTargetConfig(BaseModel):
 
 class SourceConfig(BaseModel):
     """Source configuration section."""
+    model_config = _SECTION_CONFIG
+
     type: str = Field(default="s3", description="Source type (currently only 's3' supported)")
     path: str = Field(..., description="S3 path/prefix (shared across environments)")
     sample_file: Optional[str] = Field(None, description="Optional sample file path for schema detection")
@@ -61,13 +91,15 @@ class SourceConfig(BaseModel):
 
     @validator('type')
     def validate_source_type(cls, v):
-        if v != "s3":
+        if v not in _SOURCE_TYPES:
             raise ValueError("Currently only 's3' source type is supported")
         return v
 
 
 class TargetConfig(BaseModel):
     """Target configuration section."""
+    model_config = _SECTION_CONFIG
+
     table: str = Field(..., description="Target table name (shared across environments)")
     # Environment-specific configs
     default: EnvironmentTargetConfig = Field(..., description="Default environment target config")
@@ -78,6 +110,8 @@ class TargetConfig(BaseModel):
 
 class IngestionConfig(BaseModel):
     """Ingestion configuration section."""
+    model_config = _SECTION_CONFIG
+
     type: IngestionType = Field(..., description="Ingestion type: one_time or snowpipe")
     file_format: FileFormat = Field(..., description="File format: CSV, JSON, or PARQUET")
     copy_options: Optional[Dict[str, Any]] = Field(None, description="Optional copy options for file format")
@@ -85,6 +119,8 @@ class IngestionConfig(BaseModel):
 
 class ContractMetadata(BaseModel):
     """Contract metadata section."""
+    model_config = _SECTION_CONFIG
+
     name: str = Field(..., description="Contract name")
     description: Optional[str] = Field(None, description="Contract description")
     created_at: Optional[str] = Field(None, description="Creation timestamp (ISO format)")
@@ -100,44 +136,76 @@ class IngestionContract(BaseModel):
     table_schema: List[ColumnSchema] = Field(..., alias="schema", description="Table schema (list of columns)")
     ingestion: IngestionConfig = Field(..., description="Ingestion configuration")
 
-    class Config:
-        use_enum_values = True
+    # Frozen so validated contracts can be cached and shared across requests
+    model_config = ConfigDict(use_enum_values=True, frozen=True, revalidate_instances="never")
+
+    # Resolved environment configs, filled lazily by get_environment_config
+    _env_cache: Dict[str, Dict[str, Any]] = PrivateAttr(default_factory=dict)
 
     @validator('version')
     def validate_version(cls, v):
-        if v != "1.0":
+        if v not in _SUPPORTED_VERSIONS:
             raise ValueError("Currently only version '1.0' is supported")
         return v
 
+    @classmethod
+    def from_trusted(cls, data: Dict[str, Any]) -> "IngestionContract":
+        """Build a contract from stored contract_data without re-validating.
+
+        Only for payloads that already passed validate_contract before being
+        persisted; user-submitted contracts must use full validation.
+        """
+        # model_construct does not recurse, so build each nested model explicitly
+        source = data["source"]
+        target = data["target"]
+        ingestion = data["ingestion"]
+        return cls.model_construct(
+            version=data.get("version", "1.0"),
+            metadata=ContractMetadata.model_construct(**data["metadata"]),
+            source=SourceConfig.model_construct(**{
+                **source,
+                **{
+                    env: EnvironmentSourceConfig.model_construct(**source[env])
+                    for env in ("default", *_ENVIRONMENTS) if source.get(env)
+                },
+            }),
+            target=TargetConfig.model_construct(**{
+                **target,
+                **{
+                    env: EnvironmentTargetConfig.model_construct(**target[env])
+                    for env in ("default", *_ENVIRONMENTS) if target.get(env)
+                },
+            }),
+            table_schema=[ColumnSchema.model_construct(**col) for col in data["schema"]],
+            ingestion=IngestionConfig.model_construct(
+                type=IngestionType(ingestion["type"]),
+                file_format=FileFormat(ingestion["file_format"]),
+                copy_options=ingestion.get("copy_options"),
+            ),
+        )
+
     def get_environment_config(self, environment: str = "default") -> Dict[str, Any]:
-        """Get resolved configuration for a specific environment."""
+        """Get resolved configuration for a specific environment.
+
+        Results are memoized per instance; callers must not mutate the returned dict.
+        """
         env = environment.lower()
-        
-        # Get source config for environment
+        # Unknown environments fall back to default
+        if env not in _ENVIRONMENTS:
+            env = "default"
+        cached = self._env_cache.get(env)
+        if cached is not None:
+            return cached
+
         if env == "default":
             source_env = self.source.default
-        elif env == "dev" and self.source.dev:
-            source_env = self.source.dev
-        elif env == "uat" and self.source.uat:
-            source_env = self.source.uat
-        elif env == "prod" and self.source.prod:
-            source_env = self.source.prod
-        else:
-            source_env = self.source.default  # Fallback to default
-        
-        # Get target config for environment
-        if env == "default":
             target_env = self.target.default
-        elif env == "dev" and self.target.dev:
-            target_env = self.target.dev
-        elif env == "uat" and self.target.uat:
-            target_env = self.target.uat
-        elif env == "prod" and self.target.prod:
-            target_env = self.target.prod
         else:
-            target_env = self.target.default  # Fallback to default
-        
-        return {
+            # Unset environments fall back to default
+            source_env = getattr(self.source, env) or self.source.default
+            target_env = getattr(self.target, env) or self.target.default
+
+        resolved = {
             "source": {
                 "type": self.source.type,
                 "path": self.source.path,
@@ -151,7 +219,9 @@ class IngestionContract(BaseModel):
                 "database": target_env.database,
                 "schema": target_env.schema_name,
             },
-            "schema": [col.dict() for col in self.table_schema],
-            "ingestion": self.ingestion.dict(),
+            "schema": _COLUMN_LIST_ADAPTER.dump_python(self.table_schema),
+            "ingestion": self.ingestion.model_dump(mode="json"),
         }
+        self._env_cache[env] = resolved
+        return resolved
 
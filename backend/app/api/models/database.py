@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, ForeignKey, JSON, Index, UniqueConstraint
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, UniqueConstraint, CheckConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -28,6 +30,41 @@ class RunStatus(str, enum.Enum):
     FAILED = "failed"
 
 
+class StringEnum(TypeDecorator):
+    """Store a Python enum by member name in a plain VARCHAR column.
+
+    Member names are what SQLAlchemy's Enum type persisted, so rows in existing
+    native-enum columns load unchanged while skipping the Enum type's processing.
+    """
+    impl = String(16)
+    cache_ok = True
+
+    def __init__(self, enum_class, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.enum_class = enum_class
+        # value -> member name; str-enum members hash like their values, so both kinds hit
+        self._names_by_value = {member.value: member.name for member in enum_class}
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        name = self._names_by_value.get(value)
+        if name is None:
+            raise ValueError(f"{value!r} is not a valid {self.enum_class.__name__}")
+        return name
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self.enum_class[value]
+
+
+def enum_check(column: str, enum_class, name: str) -> CheckConstraint:
+    """CHECK constraint restricting a StringEnum column to the enum's member names."""
+    names = ", ".join(f"'{member.name}'" for member in enum_class)
+    return CheckConstraint(f"{column} IN ({names})", name=name)
+
+
 class Tenant(Base):
     __tablename__ = "tenants"
 
@@ -39,6 +76,7 @@ class Tenant(Base):
     users = relationship("User", back_populates="tenant")
     projects = relationship("Project", back_populates="tenant")
     contracts = relationship("Contract", back_populates="tenant")
+    connections = relationship("Connection", back_populates="tenant")
 
 
 class User(Base):
@@ -62,13 +100,22 @@ class Connection(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)  # Owner's tenant, denormalized for tenant-scoped lookups
     name = Column(String, nullable=False)
-    type = Column(Enum(ConnectionType), nullable=False)
+    type = Column(StringEnum(ConnectionType), nullable=False)
     encrypted_credentials = Column(Text, nullable=False)  # JSON encrypted
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     user = relationship("User", back_populates="connections")
+    tenant = relationship("Tenant", back_populates="connections")
+
+    __table_args__ = (
+        enum_check('type', ConnectionType, 'ck_connection_type'),
+        Index('idx_connection_user_id', 'user_id', 'id'),
+        Index('idx_connection_user_type', 'user_id', 'type'),
+        Index('idx_connection_tenant_name', 'tenant_id', 'name'),
+    )
 
 
 class Pipeline(Base):
@@ -77,7 +124,7 @@ class Pipeline(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     name = Column(String, nullable=False)
-    ingestion_type = Column(Enum(IngestionType), nullable=False)
+    ingestion_type = Column(StringEnum(IngestionType), nullable=False)
     s3_connection_id = Column(Integer, ForeignKey("connections.id"), nullable=False)
     snowflake_connection_id = Column(Integer, ForeignKey("connections.id"), nullable=False)
     s3_path = Column(String, nullable=False)  # File path or prefix for Snowpipe
@@ -85,29 +132,40 @@ class Pipeline(Base):
     target_schema = Column(String, nullable=False)
     target_table = Column(String, nullable=False)
     snowpipe_name = Column(String, nullable=True)  # For Snowpipe pipelines
-    status = Column(Enum(PipelineStatus), default=PipelineStatus.ACTIVE)
-    config = Column(JSON, nullable=True)  # Additional configuration
+    status = Column(StringEnum(PipelineStatus), default=PipelineStatus.ACTIVE)
+    config = Column(JSONB, nullable=True)  # Additional configuration
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     user = relationship("User", back_populates="pipelines")
     runs = relationship("PipelineRun", back_populates="pipeline")
 
+    __table_args__ = (
+        enum_check('ingestion_type', IngestionType, 'ck_pipeline_ingestion_type'),
+        enum_check('status', PipelineStatus, 'ck_pipeline_status'),
+    )
+
 
 class PipelineRun(Base):
     __tablename__ = "pipeline_runs"
 
     id = Column(Integer, primary_key=True, index=True)
     pipeline_id = Column(Integer, ForeignKey("pipelines.id"), nullable=False)
-    status = Column(Enum(RunStatus), default=RunStatus.PENDING)
+    status = Column(StringEnum(RunStatus), default=RunStatus.PENDING)
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     error_message = Column(Text, nullable=True)
     rows_loaded = Column(Integer, nullable=True)
-    run_metadata = Column(JSON, nullable=True)  # Additional run metadata
+    run_metadata = Column(JSONB, nullable=True)  # Additional run metadata
 
     pipeline = relationship("Pipeline", back_populates="runs")
 
+    __table_args__ = (
+        enum_check('status', RunStatus, 'ck_pipeline_run_status'),
+        # Run history is listed newest-first per pipeline
+        Index('idx_pipeline_run_pipeline_started', 'pipeline_id', 'started_at'),
+    )
+
 
 class Project(Base):
     __tablename__ = "projects"
@@ -117,7 +175,7 @@ class Project(Base):
     organization = Column(String, nullable=False)
     department = Column(String, nullable=False)
     project = Column(String, nullable=False)
-    data_governance = Column(JSON, nullable=True)  # Contains owners, stakeholders, stewards
+    data_governance = Column(JSONB, nullable=True)  # Contains owners, stakeholders, stewards
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -125,8 +183,8 @@ class Project(Base):
     contracts = relationship("Contract", back_populates="project")
 
     __table_args__ = (
+        # Its unique index also serves tenant / organization / department list filters
         UniqueConstraint('tenant_id', 'organization', 'department', 'project', name='uq_project_org_dept_proj'),
-        Index('idx_project_tenant_org', 'tenant_id', 'organization'),
     )
 
 
@@ -143,18 +201,19 @@ class Contract(Base):
     department = Column(String, nullable=False)
     project_name = Column(String, nullable=False)  # Denormalized for filtering
     source = Column(String, nullable=False)
-    contract_data = Column(JSON, nullable=False)  # Full contract structure
+    contract_data = Column(JSONB, nullable=False)  # Full contract structure
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     tenant = relationship("Tenant", back_populates="contracts")
     user = relationship("User", back_populates="contracts")
     project = relationship("Project", back_populates="contracts")
 
     __table_args__ = (
-        Index('idx_contract_tenant_org', 'tenant_id', 'organization'),
+        Index('idx_contract_tenant_org_dept_proj', 'tenant_id', 'organization', 'department', 'project_name'),
         Index('idx_contract_tenant_dept', 'tenant_id', 'department'),
         Index('idx_contract_tenant_project', 'tenant_id', 'project_name'),
         Index('idx_contract_tenant_source', 'tenant_id', 'source'),
+        Index('idx_contract_tenant_created', 'tenant_id', 'created_at'),
     )
 
@@ -1,37 +1,49 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import threading
 import jwt
-import httpx
+from cachetools import TTLCache
 from app.core.config import settings
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, raiseload
 from app.db.session import get_db
 from app.api.models.database import User
-from app.core.tenant import get_or_create_default_tenant
+from app.core.tenant import get_default_tenant_id, get_user_tenant_id
 
 security = HTTPBearer()
 
+# Routes only read the user's own columns (id, tenant_id); relationship access on the
+# request user would be a hidden extra query, so make it fail loudly instead
+_USER_LOAD_OPTIONS = (raiseload("*"),)
 
-async def get_clerk_jwks():
-    """Fetch Clerk JWKS (JSON Web Key Set) for token verification."""
-    # For MVP, we'll use a simple approach - verify token and extract user ID
-    # In production, you'd want to cache the JWKS
-    async with httpx.AsyncClient() as client:
-        # Clerk JWKS URL format: https://<your-clerk-domain>/.well-known/jwks.json
-        # For now, we'll verify the token structure and extract claims
-        pass
+# clerk_user_id -> users.id, so repeat requests resolve the user by primary key
+_USER_ID_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_USER_ID_CACHE_LOCK = threading.Lock()
 
+# Clerk signing keys are fetched once and kept in memory by PyJWKClient
+_jwks_client = (
+    jwt.PyJWKClient(settings.CLERK_JWKS_URL, cache_keys=True, lifespan=3600)
+    if settings.CLERK_JWKS_URL else None
+)
 
-async def get_current_user(
+
+def decode_clerk_token(token: str) -> dict:
+    """Decode a Clerk token, verifying its signature when CLERK_JWKS_URL is configured."""
+    if _jwks_client is None:
+        # No JWKS configured (local/MVP setups): read claims without verification
+        return jwt.decode(token, options={"verify_signature": False})
+    signing_key = _jwks_client.get_signing_key_from_jwt(token).key
+    return jwt.decode(token, signing_key, algorithms=["RS256"], options={"verify_aud": False})
+
+
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ) -> User:
     """Verify Clerk JWT token and get or create user."""
     try:
         token = credentials.credentials
         
-        # Decode token without verification first to get the user ID
-        # In production, you should verify the token signature with Clerk's JWKS
-        decoded = jwt.decode(token, options={"verify_signature": False})
+        decoded = decode_clerk_token(token)
         clerk_user_id = decoded.get("sub") or decoded.get("user_id")
         
         if not clerk_user_id:
@@ -41,26 +53,31 @@ async def get_current_user(
             )
         
         # Get or create user in database
-        user = db.query(User).filter(User.clerk_user_id == clerk_user_id).first()
+        with _USER_ID_CACHE_LOCK:
+            cached_user_id = _USER_ID_CACHE.get(clerk_user_id)
+        user = (
+            db.get(User, cached_user_id, options=_USER_LOAD_OPTIONS)
+            if cached_user_id is not None else None
+        )
+        if not user:
+            user = db.query(User).options(*_USER_LOAD_OPTIONS).filter(
+                User.clerk_user_id == clerk_user_id
+            ).first()
         if not user:
             # Extract email from token if available
             email = decoded.get("email", "")
             # Assign default tenant to new user
-            tenant = get_or_create_default_tenant(db)
             user = User(
                 clerk_user_id=clerk_user_id,
                 email=email,
-                tenant_id=tenant.id
+                tenant_id=get_default_tenant_id(db)
             )
             db.add(user)
             db.commit()
-            db.refresh(user)
-        elif not user.tenant_id:
-            # Ensure existing users have a tenant (migration support)
-            tenant = get_or_create_default_tenant(db)
-            user.tenant_id = tenant.id
-            db.commit()
-            db.refresh(user)
+        
+        if cached_user_id != user.id:
+            with _USER_ID_CACHE_LOCK:
+                _USER_ID_CACHE[clerk_user_id] = user.id
         
         return user
     except jwt.DecodeError:
@@ -74,3 +91,7 @@ async def get_current_user(
             detail="Invalid authentication credentials",
         )
 
+
+def get_current_tenant_id(current_user: User = Depends(get_current_user)) -> int:
+    """Resolve the current user's tenant once per request (FastAPI caches dependencies)."""
+    return get_user_tenant_id(current_user)
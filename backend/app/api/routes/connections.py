@@ -1,17 +1,97 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional
-import json
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+import orjson
+import threading
+from cachetools import TTLCache
 
 from app.db.session import get_db
 from app.api.models.database import User, Connection, ConnectionType
 from app.api.routes.auth import get_current_user
-from app.core.security import encrypt_data, decrypt_data
-from app.services.s3_service import test_s3_connection, list_buckets
-from app.services.snowflake_service import test_snowflake_connection, get_snowflake_connection, list_databases, list_schemas
-
-router = APIRouter()
+from app.core.security import encrypt_data, decrypt_credentials
+from app.services.s3_service import test_s3_connection, list_buckets, evict_s3_client
+from app.services.snowflake_service import test_snowflake_connection, pooled_metadata_connection, list_databases, list_schemas, list_schemas_by_database, list_schemas_multi, list_pipes
+
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Short-lived caches for catalog listings, so UI browsing doesn't hit Snowflake/S3 each time
+_DATABASES_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=60)  # connection_id -> databases
+_SCHEMAS_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=60)  # (connection_id, database) -> schemas
+_BUCKETS_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=60)  # connection_id -> buckets
+_PIPES_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=60)  # (connection_id, database, schema) -> pipes
+_LISTING_CACHE_LOCK = threading.Lock()
+
+
+def _get_cached_listing(cache: TTLCache, key: Any) -> Optional[List[str]]:
+    with _LISTING_CACHE_LOCK:
+        return cache.get(key)
+
+
+def _set_cached_listing(cache: TTLCache, key: Any, value: List[str]) -> None:
+    with _LISTING_CACHE_LOCK:
+        cache[key] = value
+
+
+def _get_cached_browse(connection_id: int) -> Optional[Dict[str, Any]]:
+    """Assemble a browse payload from cached listings, if databases and all their schemas are cached."""
+    with _LISTING_CACHE_LOCK:
+        databases = _DATABASES_CACHE.get(connection_id)
+        if databases is None:
+            return None
+        schemas = {}
+        for database in databases:
+            database_schemas = _SCHEMAS_CACHE.get((connection_id, database))
+            if database_schemas is None:
+                return None
+            schemas[database] = database_schemas
+    return {"databases": databases, "schemas": schemas}
+
+
+def _invalidate_listings(connection_id: int) -> None:
+    """Drop cached listings for a connection after its credentials change."""
+    with _LISTING_CACHE_LOCK:
+        _DATABASES_CACHE.pop(connection_id, None)
+        _BUCKETS_CACHE.pop(connection_id, None)
+        for cache in (_SCHEMAS_CACHE, _PIPES_CACHE):
+            for key in [k for k in cache.keys() if k[0] == connection_id]:
+                cache.pop(key, None)
+
+
+_CONNECTION_LABELS = {
+    None: "Connection",
+    ConnectionType.S3: "S3 connection",
+    ConnectionType.SNOWFLAKE: "Snowflake connection",
+}
+
+
+def owned_connection(required_type: Optional[ConnectionType] = None):
+    """Dependency factory loading the path's connection if the current user owns it.
+
+    Raises 404 when the connection is missing, owned by someone else, or not of required_type.
+    """
+    def _load(
+        connection_id: int,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db, scope="function")
+    ) -> Connection:
+        query = select(Connection).where(
+            Connection.id == connection_id,
+            Connection.user_id == current_user.id
+        )
+        if required_type is not None:
+            query = query.where(Connection.type == required_type)
+        connection = db.execute(query).scalar_one_or_none()
+        if not connection:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"{_CONNECTION_LABELS[required_type]} not found"
+            )
+        return connection
+    return _load
 
 
 class S3ConnectionCreate(BaseModel):
@@ -30,25 +110,23 @@ class SnowflakeConnectionCreate(BaseModel):
 
 
 class ConnectionResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     type: str
-    created_at: str
-
-    class Config:
-        from_attributes = True
+    created_at: datetime
 
 
 class ConnectionDetailResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     type: str
-    created_at: str
+    created_at: datetime
     credentials: dict  # Decrypted credentials
 
-    class Config:
-        from_attributes = True
-
 
 @router.post("/connections/s3/test")
 def test_s3_connection_endpoint(
@@ -74,7 +152,7 @@ def test_s3_connection_endpoint(
 def create_s3_connection(
     connection: S3ConnectionCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Create and test S3 connection."""
     # Test connection first
@@ -96,24 +174,24 @@ def create_s3_connection(
         "secret_access_key": connection.secret_access_key,
         "region": connection.region
     }
-    encrypted_credentials = encrypt_data(json.dumps(credentials))
+    encrypted_credentials = encrypt_data(orjson.dumps(credentials))
     
     # Create connection
     db_connection = Connection(
         user_id=current_user.id,
+        tenant_id=current_user.tenant_id,
         name=connection.name,
         type=ConnectionType.S3,
         encrypted_credentials=encrypted_credentials
     )
     db.add(db_connection)
     db.commit()
-    db.refresh(db_connection)
     
     return ConnectionResponse(
         id=db_connection.id,
         name=db_connection.name,
         type=db_connection.type.value,
-        created_at=db_connection.created_at.isoformat()
+        created_at=db_connection.created_at
     )
 
 
@@ -145,7 +223,7 @@ def test_snowflake_connection_endpoint(
 def create_snowflake_connection(
     connection: SnowflakeConnectionCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Create and test Snowflake connection."""
     # Test connection first
@@ -173,72 +251,56 @@ def create_snowflake_connection(
     }
     if connection.role:
         credentials["role"] = connection.role
-    encrypted_credentials = encrypt_data(json.dumps(credentials))
+    encrypted_credentials = encrypt_data(orjson.dumps(credentials))
     
     # Create connection
     db_connection = Connection(
         user_id=current_user.id,
+        tenant_id=current_user.tenant_id,
         name=connection.name,
         type=ConnectionType.SNOWFLAKE,
         encrypted_credentials=encrypted_credentials
     )
     db.add(db_connection)
     db.commit()
-    db.refresh(db_connection)
     
     return ConnectionResponse(
         id=db_connection.id,
         name=db_connection.name,
         type=db_connection.type.value,
-        created_at=db_connection.created_at.isoformat()
+        created_at=db_connection.created_at
     )
 
 
 @router.get("/connections", response_model=List[ConnectionResponse])
 def list_connections(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """List all connections for current user."""
-    connections = db.query(Connection).filter(Connection.user_id == current_user.id).all()
-    return [
-        ConnectionResponse(
-            id=conn.id,
-            name=conn.name,
-            type=conn.type.value,
-            created_at=conn.created_at.isoformat()
-        )
-        for conn in connections
-    ]
+    # Project only the listed columns; skips loading encrypted_credentials per row
+    rows = db.execute(
+        select(Connection.id, Connection.name, Connection.type, Connection.created_at)
+        .where(Connection.user_id == current_user.id)
+    ).all()
+    # Rows carry exactly ConnectionResponse's attributes; the response model validates and
+    # serializes them (from_attributes) without an intermediate model per row
+    return rows
 
 
 @router.get("/connections/{connection_id}", response_model=ConnectionDetailResponse)
 def get_connection(
-    connection_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    connection: Connection = Depends(owned_connection())
 ):
     """Get connection details with decrypted credentials."""
-    connection = db.query(Connection).filter(
-        Connection.id == connection_id,
-        Connection.user_id == current_user.id
-    ).first()
-    
-    if not connection:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Connection not found"
-        )
-    
     # Decrypt credentials
-    credentials_json = decrypt_data(connection.encrypted_credentials)
-    credentials = json.loads(credentials_json)
+    credentials = decrypt_credentials(connection.encrypted_credentials)
     
     return ConnectionDetailResponse(
         id=connection.id,
         name=connection.name,
         type=connection.type.value,
-        created_at=connection.created_at.isoformat(),
+        created_at=connection.created_at,
         credentials=credentials
     )
 
@@ -248,21 +310,9 @@ def update_s3_connection(
     connection_id: int,
     connection: S3ConnectionCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Update S3 connection."""
-    db_connection = db.query(Connection).filter(
-        Connection.id == connection_id,
-        Connection.user_id == current_user.id,
-        Connection.type == ConnectionType.S3
-    ).first()
-    
-    if not db_connection:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="S3 connection not found"
-        )
-    
     # Test connection first
     try:
         test_s3_connection(
@@ -282,19 +332,34 @@ def update_s3_connection(
         "secret_access_key": connection.secret_access_key,
         "region": connection.region
     }
-    encrypted_credentials = encrypt_data(json.dumps(credentials))
+    encrypted_credentials = encrypt_data(orjson.dumps(credentials))
+    
+    # Update connection in a single round trip; no row means not found or not owned
+    row = db.execute(
+        update(Connection)
+        .where(
+            Connection.id == connection_id,
+            Connection.user_id == current_user.id,
+            Connection.type == ConnectionType.S3
+        )
+        .values(name=connection.name, encrypted_credentials=encrypted_credentials)
+        .returning(Connection.id, Connection.name, Connection.type, Connection.created_at)
+    ).first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="S3 connection not found"
+        )
     
-    # Update connection
-    db_connection.name = connection.name
-    db_connection.encrypted_credentials = encrypted_credentials
     db.commit()
-    db.refresh(db_connection)
+    _invalidate_listings(connection_id)
     
     return ConnectionResponse(
-        id=db_connection.id,
-        name=db_connection.name,
-        type=db_connection.type.value,
-        created_at=db_connection.created_at.isoformat()
+        id=row.id,
+        name=row.name,
+        type=row.type.value,
+        created_at=row.created_at
     )
 
 
@@ -303,21 +368,9 @@ def update_snowflake_connection(
     connection_id: int,
     connection: SnowflakeConnectionCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Update Snowflake connection."""
-    db_connection = db.query(Connection).filter(
-        Connection.id == connection_id,
-        Connection.user_id == current_user.id,
-        Connection.type == ConnectionType.SNOWFLAKE
-    ).first()
-    
-    if not db_connection:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Snowflake connection not found"
-        )
-    
     # Test connection first
     try:
         test_snowflake_connection(
@@ -343,83 +396,81 @@ def update_snowflake_connection(
     }
     if connection.role:
         credentials["role"] = connection.role
-    encrypted_credentials = encrypt_data(json.dumps(credentials))
+    encrypted_credentials = encrypt_data(orjson.dumps(credentials))
+    
+    # Update connection in a single round trip; no row means not found or not owned
+    row = db.execute(
+        update(Connection)
+        .where(
+            Connection.id == connection_id,
+            Connection.user_id == current_user.id,
+            Connection.type == ConnectionType.SNOWFLAKE
+        )
+        .values(name=connection.name, encrypted_credentials=encrypted_credentials)
+        .returning(Connection.id, Connection.name, Connection.type, Connection.created_at)
+    ).first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Snowflake connection not found"
+        )
     
-    # Update connection
-    db_connection.name = connection.name
-    db_connection.encrypted_credentials = encrypted_credentials
     db.commit()
-    db.refresh(db_connection)
+    _invalidate_listings(connection_id)
     
     return ConnectionResponse(
-        id=db_connection.id,
-        name=db_connection.name,
-        type=db_connection.type.value,
-        created_at=db_connection.created_at.isoformat()
+        id=row.id,
+        name=row.name,
+        type=row.type.value,
+        created_at=row.created_at
     )
 
 
 @router.delete("/connections/{connection_id}")
 def delete_connection(
-    connection_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    connection: Connection = Depends(owned_connection()),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Delete a connection."""
-    connection = db.query(Connection).filter(
-        Connection.id == connection_id,
-        Connection.user_id == current_user.id
-    ).first()
-    
-    if not connection:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Connection not found"
-        )
-    
+    connection_id = connection.id
     db.delete(connection)
     db.commit()
+    _invalidate_listings(connection_id)
+    if connection.type == ConnectionType.S3:
+        credentials = decrypt_credentials(connection.encrypted_credentials)
+        evict_s3_client(
+            credentials['access_key_id'],
+            credentials['secret_access_key'],
+            credentials.get('region', 'us-east-1')
+        )
     return {"message": "Connection deleted"}
 
 
 @router.get("/connections/{connection_id}/databases")
 def get_databases(
-    connection_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    connection: Connection = Depends(owned_connection(ConnectionType.SNOWFLAKE))
 ):
     """Get list of databases for a Snowflake connection."""
-    connection = db.query(Connection).filter(
-        Connection.id == connection_id,
-        Connection.user_id == current_user.id,
-        Connection.type == ConnectionType.SNOWFLAKE
-    ).first()
-    
-    if not connection:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Snowflake connection not found"
-        )
+    databases = _get_cached_listing(_DATABASES_CACHE, connection.id)
+    if databases is not None:
+        return {"databases": databases}
     
     # Decrypt credentials
-    credentials_json = decrypt_data(connection.encrypted_credentials)
-    credentials = json.loads(credentials_json)
+    credentials = decrypt_credentials(connection.encrypted_credentials)
     
     # Connect to Snowflake
     try:
-        conn = get_snowflake_connection(
+        # SHOW needs no warehouse: use a warehouse-less session so none is resumed
+        with pooled_metadata_connection(
             credentials['account'],
             credentials['user'],
             credentials['password'],
-            credentials.get('warehouse'),
-            credentials.get('database'),
-            credentials.get('schema'),
             credentials.get('role')
-        )
-        
-        databases = list_databases(conn)
-        conn.close()
+        ) as conn:
+            databases = list_databases(conn)
         
+        _set_cached_listing(_DATABASES_CACHE, connection.id, databases)
         return {"databases": databases}
     except Exception as e:
         raise HTTPException(
@@ -430,46 +481,40 @@ def get_databases(
 
 @router.get("/connections/{connection_id}/schemas")
 def get_schemas(
-    connection_id: int,
     database: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    connection: Connection = Depends(owned_connection(ConnectionType.SNOWFLAKE))
 ):
     """Get list of schemas for a Snowflake connection, optionally filtered by database."""
-    connection = db.query(Connection).filter(
-        Connection.id == connection_id,
-        Connection.user_id == current_user.id,
-        Connection.type == ConnectionType.SNOWFLAKE
-    ).first()
-    
-    if not connection:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Snowflake connection not found"
-        )
+    schemas = _get_cached_listing(_SCHEMAS_CACHE, (connection.id, database))
+    if schemas is not None:
+        return {"schemas": schemas}
     
     # Decrypt credentials
-    credentials_json = decrypt_data(connection.encrypted_credentials)
-    credentials = json.loads(credentials_json)
+    credentials = decrypt_credentials(connection.encrypted_credentials)
     
     # Use provided database or default from connection
     target_database = database or credentials.get('database', '')
     
     # Connect to Snowflake
     try:
-        conn = get_snowflake_connection(
+        # SHOW needs no warehouse (or session database: the listings name it explicitly)
+        with pooled_metadata_connection(
             credentials['account'],
             credentials['user'],
             credentials['password'],
-            credentials.get('warehouse'),
-            target_database or credentials.get('database'),
-            credentials.get('schema'),
             credentials.get('role')
-        )
-        
-        schemas = list_schemas(conn, target_database if target_database else None)
-        conn.close()
+        ) as conn:
+            # One account-wide SHOW answers this and every later schemas request for the
+            # connection; fall back to a per-database SHOW if it can't
+            schemas_by_database = list_schemas_by_database(conn) if target_database else None
+            if schemas_by_database is not None and target_database in schemas_by_database:
+                schemas = schemas_by_database[target_database]
+                for other_database, other_schemas in schemas_by_database.items():
+                    _set_cached_listing(_SCHEMAS_CACHE, (connection.id, other_database), other_schemas)
+            else:
+                schemas = list_schemas(conn, target_database if target_database else None)
         
+        _set_cached_listing(_SCHEMAS_CACHE, (connection.id, database), schemas)
         return {"schemas": schemas}
     except Exception as e:
         raise HTTPException(
@@ -478,28 +523,98 @@ def get_schemas(
         )
 
 
-@router.get("/connections/{connection_id}/buckets")
-def get_buckets(
-    connection_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+@router.get("/connections/{connection_id}/pipes")
+def get_pipes(
+    database: str,
+    schema: str,
+    connection: Connection = Depends(owned_connection(ConnectionType.SNOWFLAKE))
 ):
-    """Get list of buckets for an S3 connection."""
-    connection = db.query(Connection).filter(
-        Connection.id == connection_id,
-        Connection.user_id == current_user.id,
-        Connection.type == ConnectionType.S3
-    ).first()
+    """Get the pipes in a Snowflake schema."""
+    pipes = _get_cached_listing(_PIPES_CACHE, (connection.id, database, schema))
+    if pipes is not None:
+        return {"pipes": pipes}
+    
+    # Decrypt credentials
+    credentials = decrypt_credentials(connection.encrypted_credentials)
+    
+    # Connect to Snowflake
+    try:
+        # SHOW PIPES needs no warehouse
+        with pooled_metadata_connection(
+            credentials['account'],
+            credentials['user'],
+            credentials['password'],
+            credentials.get('role')
+        ) as conn:
+            pipes = list_pipes(conn, database, schema)
+        
+        _set_cached_listing(_PIPES_CACHE, (connection.id, database, schema), pipes)
+        return {"pipes": pipes}
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch pipes: {str(e)}"
+        )
+
+
+@router.get("/connections/{connection_id}/browse")
+def browse_snowflake_connection(
+    connection: Connection = Depends(owned_connection(ConnectionType.SNOWFLAKE))
+):
+    """Get databases and their schemas for a Snowflake connection in one call.
+
+    Uses one pooled session and two queries instead of a schemas request per database.
+    """
+    cached = _get_cached_browse(connection.id)
+    if cached is not None:
+        return cached
+    
+    # Decrypt credentials
+    credentials = decrypt_credentials(connection.encrypted_credentials)
     
-    if not connection:
+    # Browsing is SHOW-only, so sessions carry no warehouse and never resume one
+    def connect():
+        return pooled_metadata_connection(
+            credentials['account'],
+            credentials['user'],
+            credentials['password'],
+            credentials.get('role')
+        )
+    
+    try:
+        with connect() as conn:
+            databases = list_databases(conn)
+            schemas_by_database = list_schemas_by_database(conn)
+        
+        if schemas_by_database is None:
+            # No usable account-wide listing: one SHOW per database, fanned out over the pool
+            schemas = list_schemas_multi(connect, databases)
+        else:
+            schemas = {database: schemas_by_database.get(database, []) for database in databases}
+        
+        # Warm the per-listing caches for follow-up databases/schemas requests
+        _set_cached_listing(_DATABASES_CACHE, connection.id, databases)
+        for database, database_schemas in schemas.items():
+            _set_cached_listing(_SCHEMAS_CACHE, (connection.id, database), database_schemas)
+        return {"databases": databases, "schemas": schemas}
+    except Exception as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="S3 connection not found"
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch databases: {str(e)}"
         )
+
+
+@router.get("/connections/{connection_id}/buckets")
+def get_buckets(
+    connection: Connection = Depends(owned_connection(ConnectionType.S3))
+):
+    """Get list of buckets for an S3 connection."""
+    buckets = _get_cached_listing(_BUCKETS_CACHE, connection.id)
+    if buckets is not None:
+        return {"buckets": buckets}
     
     # Decrypt credentials
-    credentials_json = decrypt_data(connection.encrypted_credentials)
-    credentials = json.loads(credentials_json)
+    credentials = decrypt_credentials(connection.encrypted_credentials)
     
     # List buckets
     try:
@@ -508,6 +623,7 @@ def get_buckets(
             credentials['secret_access_key'],
             credentials.get('region', 'us-east-1')
         )
+        _set_cached_listing(_BUCKETS_CACHE, connection.id, buckets)
         return {"buckets": buckets}
     except Exception as e:
         raise HTTPException(
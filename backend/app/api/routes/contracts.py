@@ -1,29 +1,123 @@
 """Contract API endpoints with tenant isolation."""
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import ORJSONResponse, Response
+from sqlalchemy import Text, cast, delete, select, tuple_
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
-import yaml
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Dict, Any, Tuple
+from datetime import datetime
+import base64
+import threading
+from operator import attrgetter
+from cachetools import TTLCache
+import orjson
 
 from app.db.session import get_db
 from app.api.models.database import User, Contract, Project
-from app.api.routes.auth import get_current_user
-from app.core.tenant import get_user_tenant_id
+from app.api.routes.auth import get_current_user, get_current_tenant_id
 from app.services.contract_service import (
-    parse_contract,
     validate_contract,
-    contract_to_yaml,
+    load_stored_contract,
+    stored_contract_to_yaml,
+    stored_contract_data,
+    dump_yaml,
     contract_to_json,
     detect_schema_from_sample,
     resolve_environment_config,
-    validate_project_reference,
-    validate_connection_names
+    preflight_contract
 )
 from app.api.models.contract import IngestionContract
 
 router = APIRouter()
 
 
+# ContractResponse fields, in order; drives both list queries and ORM-to-dict conversion
+_CONTRACT_FIELDS = (
+    "id",
+    "name",
+    "description",
+    "organization",
+    "department",
+    "project_name",
+    "source",
+    "project_id",
+    "contract_data",
+    "created_at",
+    "updated_at",
+)
+_get_contract_fields = attrgetter(*_CONTRACT_FIELDS)
+
+# Same columns for read-only queries, but contract_data comes back as Postgres' JSON text:
+# it is echoed verbatim, so there's no point parsing it into a dict just to re-serialize it
+_CONTRACT_ECHO_COLUMNS = tuple(
+    cast(Contract.contract_data, Text).label("contract_data") if field == "contract_data"
+    else getattr(Contract, field)
+    for field in _CONTRACT_FIELDS
+)
+
+
+def _echo_row_to_dict(row) -> Dict[str, Any]:
+    """Shape a _CONTRACT_ECHO_COLUMNS row for ORJSONResponse, embedding contract_data as-is."""
+    contract = dict(row)
+    contract["contract_data"] = orjson.Fragment(contract["contract_data"])
+    return contract
+
+
+# Rendered preview / YAML bodies keyed by (view, contract_id, environment, updated_at).
+# updated_at moves on every write, so an edited contract never hits a stale entry
+# and deleted contracts 404 before the cache is consulted.
+_RENDERED_CONTRACTS: TTLCache = TTLCache(maxsize=1024, ttl=600)
+_RENDERED_CONTRACTS_LOCK = threading.Lock()
+
+
+def _contract_version(contract_id: int, tenant_id: int, db: Session):
+    """Return the contract's updated_at (its cache version), or 404 if not visible to the tenant."""
+    row = db.execute(
+        select(Contract.updated_at).where(
+            Contract.id == contract_id,
+            Contract.tenant_id == tenant_id
+        )
+    ).first()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Contract not found"
+        )
+    return row.updated_at
+
+
+def _rendered_response(key: Tuple, render) -> Response:
+    """Serve a cached JSON body for key, rendering and caching it on a miss."""
+    with _RENDERED_CONTRACTS_LOCK:
+        body = _RENDERED_CONTRACTS.get(key)
+    if body is None:
+        body = orjson.dumps(render())
+        with _RENDERED_CONTRACTS_LOCK:
+            _RENDERED_CONTRACTS[key] = body
+    return Response(content=body, media_type="application/json")
+
+
+def _encode_cursor(created_at: datetime, contract_id: int) -> str:
+    """Opaque keyset cursor for the contract listing (newest first)."""
+    return base64.urlsafe_b64encode(orjson.dumps([created_at.isoformat(), contract_id])).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, contract_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(contract_id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def _contract_to_dict(contract: Contract) -> Dict[str, Any]:
+    """Shape a Contract row like ContractResponse for direct JSON encoding."""
+    return dict(zip(_CONTRACT_FIELDS, _get_contract_fields(contract)))
+
+
 class ContractCreate(BaseModel):
     """Request model for creating a contract."""
     name: str
@@ -50,6 +144,8 @@ class ContractUpdate(BaseModel):
 
 class ContractResponse(BaseModel):
     """Response model for contract."""
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     name: str
     description: Optional[str]
@@ -59,11 +155,8 @@ class ContractResponse(BaseModel):
     source: str
     project_id: Optional[int]
     contract_data: Dict[str, Any]
-    created_at: str
-    updated_at: str
-
-    class Config:
-        from_attributes = True
+    created_at: datetime
+    updated_at: datetime
 
 
 class ContractValidateRequest(BaseModel):
@@ -97,113 +190,80 @@ def list_contracts(
     department: Optional[str] = Query(None),
     project_name: Optional[str] = Query(None),
     source: Optional[str] = Query(None),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
-    """List contracts for current tenant, optionally filtered by organizational hierarchy."""
-    tenant_id = get_user_tenant_id(current_user)
-    
-    query = db.query(Contract).filter(Contract.tenant_id == tenant_id)
+    """List contracts for current tenant, optionally filtered by organizational hierarchy.
+
+    Newest first, one page at a time; the X-Next-Cursor response header is set when more remain.
+    """
+    query = select(*_CONTRACT_ECHO_COLUMNS).where(Contract.tenant_id == tenant_id)
     
     if organization:
-        query = query.filter(Contract.organization == organization)
+        query = query.where(Contract.organization == organization)
     if department:
-        query = query.filter(Contract.department == department)
+        query = query.where(Contract.department == department)
     if project_name:
-        query = query.filter(Contract.project_name == project_name)
+        query = query.where(Contract.project_name == project_name)
     if source:
-        query = query.filter(Contract.source == source)
+        query = query.where(Contract.source == source)
+    if cursor:
+        query = query.where(tuple_(Contract.created_at, Contract.id) < _decode_cursor(cursor))
     
-    contracts = query.order_by(Contract.created_at.desc()).all()
+    # Fetch one extra row to learn whether another page exists
+    rows = db.execute(
+        query.order_by(Contract.created_at.desc(), Contract.id.desc()).limit(limit + 1)
+    ).mappings().all()
     
-    return [
-        ContractResponse(
-            id=c.id,
-            name=c.name,
-            description=c.description,
-            organization=c.organization,
-            department=c.department,
-            project_name=c.project_name,
-            source=c.source,
-            project_id=c.project_id,
-            contract_data=c.contract_data,
-            created_at=c.created_at.isoformat(),
-            updated_at=c.updated_at.isoformat() if c.updated_at else c.created_at.isoformat()
-        )
-        for c in contracts
-    ]
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    
+    # Rows already match ContractResponse; orjson encodes them (datetimes included) directly
+    return ORJSONResponse([_echo_row_to_dict(row) for row in rows], headers=headers)
 
 
 @router.get("/contracts/{contract_id}", response_model=ContractResponse)
 def get_contract(
     contract_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Get contract details."""
-    tenant_id = get_user_tenant_id(current_user)
-    
-    contract = db.query(Contract).filter(
-        Contract.id == contract_id,
-        Contract.tenant_id == tenant_id
-    ).first()
+    row = db.execute(
+        select(*_CONTRACT_ECHO_COLUMNS).where(
+            Contract.id == contract_id,
+            Contract.tenant_id == tenant_id
+        )
+    ).mappings().first()
     
-    if not contract:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contract not found"
         )
     
-    return ContractResponse(
-        id=contract.id,
-        name=contract.name,
-        description=contract.description,
-        organization=contract.organization,
-        department=contract.department,
-        project_name=contract.project_name,
-        source=contract.source,
-        project_id=contract.project_id,
-        contract_data=contract.contract_data,
-        created_at=contract.created_at.isoformat(),
-        updated_at=contract.updated_at.isoformat() if contract.updated_at else contract.created_at.isoformat()
-    )
+    return ORJSONResponse(_echo_row_to_dict(row))
 
 
 @router.post("/contracts", response_model=ContractResponse)
 def create_contract(
     contract: ContractCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Create a new contract."""
-    tenant_id = get_user_tenant_id(current_user)
-    
-    # Validate contract structure
+    # Validate contract structure and its project / connection references
     try:
-        validated_contract = validate_contract(contract.contract_data)
+        validated_contract = preflight_contract(contract.contract_data, contract.project_id, tenant_id, db)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid contract structure: {str(e)}"
-        )
-    
-    # Validate project reference if provided
-    if contract.project_id:
-        try:
-            validate_project_reference(contract.project_id, tenant_id, db)
-        except ValueError as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=str(e)
-            )
-    
-    # Validate connection names
-    connection_validation = validate_connection_names(validated_contract, tenant_id, db)
-    missing_connections = [name for name, exists in connection_validation.items() if not exists]
-    if missing_connections:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Connection names not found: {', '.join(missing_connections)}"
+            detail=str(e)
         )
     
     db_contract = Contract(
@@ -216,77 +276,40 @@ def create_contract(
         project_name=contract.project_name,
         source=contract.source,
         project_id=contract.project_id,
-        contract_data=contract.contract_data
+        contract_data=stored_contract_data(validated_contract)
     )
     
     db.add(db_contract)
     db.commit()
-    db.refresh(db_contract)
     
-    return ContractResponse(
-        id=db_contract.id,
-        name=db_contract.name,
-        description=db_contract.description,
-        organization=db_contract.organization,
-        department=db_contract.department,
-        project_name=db_contract.project_name,
-        source=db_contract.source,
-        project_id=db_contract.project_id,
-        contract_data=db_contract.contract_data,
-        created_at=db_contract.created_at.isoformat(),
-        updated_at=db_contract.updated_at.isoformat() if db_contract.updated_at else db_contract.created_at.isoformat()
-    )
+    return ORJSONResponse(_contract_to_dict(db_contract))
 
 
 @router.put("/contracts/{contract_id}", response_model=ContractResponse)
 def update_contract(
     contract_id: int,
     contract: ContractUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Update an existing contract."""
-    tenant_id = get_user_tenant_id(current_user)
-    
-    db_contract = db.query(Contract).filter(
-        Contract.id == contract_id,
-        Contract.tenant_id == tenant_id
-    ).first()
+    db_contract = db.get(Contract, contract_id)
     
-    if not db_contract:
+    if not db_contract or db_contract.tenant_id != tenant_id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contract not found"
         )
     
-    # If contract_data is being updated, validate it
+    # Validate the resulting contract and its project / connection references
     contract_data_to_validate = contract.contract_data if contract.contract_data else db_contract.contract_data
+    project_id_to_check = contract.project_id if contract.project_id is not None else db_contract.project_id
     try:
-        validated_contract = validate_contract(contract_data_to_validate)
+        validated_contract = preflight_contract(contract_data_to_validate, project_id_to_check, tenant_id, db)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid contract structure: {str(e)}"
-        )
-    
-    # Validate project reference if provided
-    project_id_to_check = contract.project_id if contract.project_id is not None else db_contract.project_id
-    if project_id_to_check:
-        try:
-            validate_project_reference(project_id_to_check, tenant_id, db)
-        except ValueError as e:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=str(e)
-            )
-    
-    # Validate connection names
-    connection_validation = validate_connection_names(validated_contract, tenant_id, db)
-    missing_connections = [name for name, exists in connection_validation.items() if not exists]
-    if missing_connections:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Connection names not found: {', '.join(missing_connections)}"
+            detail=str(e)
         )
     
     # Update fields
@@ -304,48 +327,35 @@ def update_contract(
         db_contract.source = contract.source
     if contract.project_id is not None:
         db_contract.project_id = contract.project_id
-    if contract.contract_data is not None:
-        db_contract.contract_data = contract.contract_data
+    if contract.contract_data:
+        db_contract.contract_data = stored_contract_data(validated_contract)
     
     db.commit()
-    db.refresh(db_contract)
     
-    return ContractResponse(
-        id=db_contract.id,
-        name=db_contract.name,
-        description=db_contract.description,
-        organization=db_contract.organization,
-        department=db_contract.department,
-        project_name=db_contract.project_name,
-        source=db_contract.source,
-        project_id=db_contract.project_id,
-        contract_data=db_contract.contract_data,
-        created_at=db_contract.created_at.isoformat(),
-        updated_at=db_contract.updated_at.isoformat() if db_contract.updated_at else db_contract.created_at.isoformat()
-    )
+    return ORJSONResponse(_contract_to_dict(db_contract))
 
 
 @router.delete("/contracts/{contract_id}")
 def delete_contract(
     contract_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Delete a contract."""
-    tenant_id = get_user_tenant_id(current_user)
-    
-    contract = db.query(Contract).filter(
-        Contract.id == contract_id,
-        Contract.tenant_id == tenant_id
-    ).first()
+    # Single DELETE; avoids loading the row (and its contract_data) just to remove it
+    result = db.execute(
+        delete(Contract).where(
+            Contract.id == contract_id,
+            Contract.tenant_id == tenant_id
+        )
+    )
     
-    if not contract:
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Contract not found"
         )
     
-    db.delete(contract)
     db.commit()
     
     return {"message": "Contract deleted"}
@@ -355,7 +365,7 @@ def delete_contract(
 def validate_contract_endpoint(
     request: ContractValidateRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Validate contract structure."""
     try:
@@ -368,12 +378,10 @@ def validate_contract_endpoint(
 @router.post("/contracts/detect-schema", response_model=SchemaDetectionResponse)
 def detect_schema(
     request: SchemaDetectionRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Detect schema from a sample file."""
-    tenant_id = get_user_tenant_id(current_user)
-    
     try:
         schema = detect_schema_from_sample(
             request.connection_id,
@@ -400,67 +408,55 @@ def detect_schema(
 def preview_contract(
     contract_id: int,
     environment: str = Query("default", description="Environment: default, dev, uat, or prod"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Preview resolved contract configuration for a specific environment."""
-    tenant_id = get_user_tenant_id(current_user)
-    
-    contract = db.query(Contract).filter(
-        Contract.id == contract_id,
-        Contract.tenant_id == tenant_id
-    ).first()
+    updated_at = _contract_version(contract_id, tenant_id, db)
     
-    if not contract:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Contract not found"
-        )
+    def render():
+        contract_data = db.execute(
+            select(Contract.contract_data).where(Contract.id == contract_id)
+        ).scalar_one()
+        try:
+            validated_contract = load_stored_contract(contract_data)
+            return resolve_environment_config(validated_contract, environment)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid contract: {str(e)}"
+            )
     
-    try:
-        validated_contract = validate_contract(contract.contract_data)
-        resolved_config = resolve_environment_config(validated_contract, environment)
-        return resolved_config
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid contract: {str(e)}"
-        )
+    return _rendered_response(("preview", contract_id, environment.lower(), updated_at), render)
 
 
 @router.get("/contracts/{contract_id}/yaml")
 def get_contract_yaml(
     contract_id: int,
     environment: Optional[str] = Query(None, description="Optional environment for resolved config"),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Get contract as YAML string."""
-    tenant_id = get_user_tenant_id(current_user)
+    updated_at = _contract_version(contract_id, tenant_id, db)
     
-    contract = db.query(Contract).filter(
-        Contract.id == contract_id,
-        Contract.tenant_id == tenant_id
-    ).first()
-    
-    if not contract:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Contract not found"
-        )
+    def render():
+        contract_data = db.execute(
+            select(Contract.contract_data).where(Contract.id == contract_id)
+        ).scalar_one()
+        try:
+            # If environment specified, return resolved config
+            if environment:
+                validated_contract = load_stored_contract(contract_data)
+                resolved_config = resolve_environment_config(validated_contract, environment)
+                return {"yaml": dump_yaml(resolved_config)}
+            else:
+                return {"yaml": stored_contract_to_yaml(contract_data)}
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid contract: {str(e)}"
+            )
     
-    try:
-        validated_contract = validate_contract(contract.contract_data)
-        
-        # If environment specified, return resolved config
-        if environment:
-            resolved_config = resolve_environment_config(validated_contract, environment)
-            return {"yaml": yaml.dump(resolved_config, default_flow_style=False, sort_keys=False)}
-        else:
-            return {"yaml": contract_to_yaml(validated_contract)}
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid contract: {str(e)}"
-        )
-
+    env_key = environment.lower() if environment else None
+    return _rendered_response(("yaml", contract_id, env_key, updated_at), render)
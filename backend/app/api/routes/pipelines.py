@@ -1,19 +1,55 @@
 from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import List, Optional, Dict
 from datetime import datetime
+from operator import attrgetter
 
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.api.models.database import (
     User, Connection, Pipeline, PipelineRun,
-    IngestionType, PipelineStatus, RunStatus
+    ConnectionType, IngestionType, PipelineStatus, RunStatus
 )
 from app.api.routes.auth import get_current_user
-from app.services.pipeline_service import create_one_time_pipeline, create_snowpipe_pipeline
+from app.services.pipeline_service import create_one_time_pipeline, create_snowpipe_pipeline, default_table_name
 
 router = APIRouter()
 
+_INGESTION_TYPES = {t.value: t for t in IngestionType}
+
+# PipelineResponse fields, in order; drives both list queries and ORM-to-dict conversion
+_PIPELINE_FIELDS = (
+    "id",
+    "name",
+    "ingestion_type",
+    "status",
+    "target_database",
+    "target_schema",
+    "target_table",
+    "created_at",
+)
+_get_pipeline_fields = attrgetter(*_PIPELINE_FIELDS)
+
+
+def _pipeline_to_dict(pipeline: Pipeline) -> Dict:
+    """Shape a Pipeline row like PipelineResponse for direct JSON encoding."""
+    return dict(zip(_PIPELINE_FIELDS, _get_pipeline_fields(pipeline)))
+
+
+def _load_connections(
+    db: Session,
+    s3_connection_id: int,
+    snowflake_connection_id: int,
+    user_id: Optional[int] = None
+) -> Dict[int, Connection]:
+    """Fetch a pipeline's S3 and Snowflake connections in one round trip, keyed by id."""
+    query = select(Connection).where(Connection.id.in_([s3_connection_id, snowflake_connection_id]))
+    if user_id is not None:
+        query = query.where(Connection.user_id == user_id)
+    return {conn.id: conn for conn in db.execute(query).scalars()}
+
 
 class PipelineCreate(BaseModel):
     name: str
@@ -58,31 +94,28 @@ class PipelineRunResponse(BaseModel):
 @router.post("/pipelines", response_model=PipelineResponse)
 def create_pipeline(
     pipeline: PipelineCreate,
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Create a new ingestion pipeline."""
-    # Validate connections belong to user
-    s3_conn = db.query(Connection).filter(
-        Connection.id == pipeline.s3_connection_id,
-        Connection.user_id == current_user.id
-    ).first()
-    
-    sf_conn = db.query(Connection).filter(
-        Connection.id == pipeline.snowflake_connection_id,
-        Connection.user_id == current_user.id
-    ).first()
+    # Validate connections belong to user (both fetched in one query)
+    connections = _load_connections(
+        db, pipeline.s3_connection_id, pipeline.snowflake_connection_id, current_user.id
+    )
+    s3_conn = connections.get(pipeline.s3_connection_id)
+    sf_conn = connections.get(pipeline.snowflake_connection_id)
     
-    if not s3_conn or not sf_conn:
+    # Check types here too: a mismatch would otherwise only surface once the background load fails
+    if not s3_conn or not sf_conn or s3_conn.type != ConnectionType.S3 or sf_conn.type != ConnectionType.SNOWFLAKE:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Connection not found"
         )
     
     # Validate ingestion type
-    try:
-        ingestion_type = IngestionType(pipeline.ingestion_type)
-    except ValueError:
+    ingestion_type = _INGESTION_TYPES.get(pipeline.ingestion_type)
+    if ingestion_type is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid ingestion type. Must be 'one_time' or 'snowpipe'"
@@ -90,10 +123,9 @@ def create_pipeline(
     
     try:
         if ingestion_type == IngestionType.ONE_TIME:
-            # For one-time ingestion, determine table name first (may be auto-generated)
-            target_table = pipeline.target_table if pipeline.target_table and pipeline.target_table.strip() else None
+            # Resolve the table name up front (auto-generated from the file name if not provided)
+            target_table = pipeline.target_table if pipeline.target_table and pipeline.target_table.strip() else default_table_name(pipeline.s3_path)
             
-            # Create pipeline record with placeholder table name (will be updated)
             db_pipeline = Pipeline(
                 user_id=current_user.id,
                 name=pipeline.name,
@@ -103,7 +135,7 @@ def create_pipeline(
                 s3_path=pipeline.s3_path,
                 target_database=pipeline.target_database,
                 target_schema=pipeline.target_schema,
-                target_table=target_table or "TEMP",  # Temporary, will be updated
+                target_table=target_table,
                 status=PipelineStatus.ACTIVE,
                 config={
                     "file_format": pipeline.file_format,
@@ -111,34 +143,14 @@ def create_pipeline(
                     "s3_bucket": pipeline.s3_bucket
                 }
             )
-            db.add(db_pipeline)
-            db.flush()  # Get the ID without committing
-            
-            # Execute the pipeline
-            result = create_one_time_pipeline(
-                s3_conn,
-                sf_conn,
-                pipeline.s3_bucket,
-                pipeline.s3_path,
-                pipeline.target_database,
-                pipeline.target_schema,
-                target_table or "",  # Pass empty string if None to trigger auto-generation
-                pipeline.file_format,
-                pipeline.copy_options
-            )
+            # Run is linked through the relationship, so both rows insert in one flush
+            run = PipelineRun(pipeline=db_pipeline, status=RunStatus.RUNNING)
+            db.add_all([db_pipeline, run])
+            db.commit()
             
-            # Update with the actual table name (may have been auto-generated)
-            final_table_name = result.get("table_name", pipeline.target_table or "unknown")
-            db_pipeline.target_table = final_table_name
-            
-            # Create run record
-            run = PipelineRun(
-                pipeline_id=db_pipeline.id,
-                status=RunStatus.SUCCESS if result["status"] == "success" else RunStatus.FAILED,
-                completed_at=datetime.utcnow(),
-                rows_loaded=result.get("rows_loaded", 0)
-            )
-            db.add(run)
+            # The load itself (S3 + Snowflake) runs after the response is sent
+            background_tasks.add_task(_execute_one_time_run, db_pipeline.id, run.id)
+            return ORJSONResponse(_pipeline_to_dict(db_pipeline), status_code=status.HTTP_202_ACCEPTED)
             
         elif ingestion_type == IngestionType.SNOWPIPE:
             # For Snowpipe, table name must be provided
@@ -197,18 +209,8 @@ def create_pipeline(
             db_pipeline.snowpipe_name = result["pipe_name"]
         
         db.commit()
-        db.refresh(db_pipeline)
         
-        return PipelineResponse(
-            id=db_pipeline.id,
-            name=db_pipeline.name,
-            ingestion_type=db_pipeline.ingestion_type.value,
-            status=db_pipeline.status.value,
-            target_database=db_pipeline.target_database,
-            target_schema=db_pipeline.target_schema,
-            target_table=db_pipeline.target_table,
-            created_at=db_pipeline.created_at.isoformat()
-        )
+        return ORJSONResponse(_pipeline_to_dict(db_pipeline))
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -217,113 +219,142 @@ def create_pipeline(
         )
 
 
+def _execute_one_time_run(pipeline_id: int, run_id: int) -> None:
+    """Load a newly created one-time pipeline and record the outcome on its run.
+
+    Runs as a background task, so it uses its own session. Any failure, including a
+    pipeline or connection deleted in the meantime, marks the run FAILED rather than
+    leaving it RUNNING.
+    """
+    db = SessionLocal()
+    try:
+        run = db.get(PipelineRun, run_id)
+        if run is None:
+            # Deleted (with its pipeline) before the task started: nothing to record
+            return
+        try:
+            pipeline = db.get(Pipeline, pipeline_id)
+            if pipeline is None:
+                raise Exception("Pipeline was deleted before the run started")
+            connections = _load_connections(db, pipeline.s3_connection_id, pipeline.snowflake_connection_id)
+            s3_connection = connections.get(pipeline.s3_connection_id)
+            snowflake_connection = connections.get(pipeline.snowflake_connection_id)
+            if s3_connection is None or snowflake_connection is None:
+                raise Exception("The pipeline's S3 or Snowflake connection no longer exists")
+            config = pipeline.config or {}
+            result = create_one_time_pipeline(
+                s3_connection,
+                snowflake_connection,
+                config.get("s3_bucket"),
+                pipeline.s3_path,
+                pipeline.target_database,
+                pipeline.target_schema,
+                pipeline.target_table,
+                config.get("file_format"),
+                config.get("copy_options")
+            )
+            run.status = RunStatus.SUCCESS if result["status"] == "success" else RunStatus.FAILED
+            run.rows_loaded = result.get("rows_loaded", 0)
+            run.completed_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            db.execute(
+                update(PipelineRun).where(PipelineRun.id == run_id).values(
+                    status=RunStatus.FAILED,
+                    error_message=str(e),
+                    completed_at=datetime.utcnow()
+                )
+            )
+            db.commit()
+    finally:
+        db.close()
+
+
 @router.get("/pipelines", response_model=List[PipelineResponse])
 def list_pipelines(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """List all pipelines for current user."""
-    pipelines = db.query(Pipeline).filter(Pipeline.user_id == current_user.id).all()
-    return [
-        PipelineResponse(
-            id=p.id,
-            name=p.name,
-            ingestion_type=p.ingestion_type.value,
-            status=p.status.value,
-            target_database=p.target_database,
-            target_schema=p.target_schema,
-            target_table=p.target_table,
-            created_at=p.created_at.isoformat()
-        )
-        for p in pipelines
-    ]
+    rows = db.execute(
+        select(*(getattr(Pipeline, field) for field in _PIPELINE_FIELDS))
+        .where(Pipeline.user_id == current_user.id)
+    ).mappings().all()
+    # Rows already match PipelineResponse; orjson encodes enums and datetimes directly
+    return ORJSONResponse([dict(row) for row in rows])
 
 
 @router.get("/pipelines/{pipeline_id}", response_model=PipelineResponse)
 def get_pipeline(
     pipeline_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Get pipeline details."""
-    pipeline = db.query(Pipeline).filter(
-        Pipeline.id == pipeline_id,
-        Pipeline.user_id == current_user.id
-    ).first()
+    pipeline = db.get(Pipeline, pipeline_id)
     
-    if not pipeline:
+    if not pipeline or pipeline.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pipeline not found"
         )
     
-    return PipelineResponse(
-        id=pipeline.id,
-        name=pipeline.name,
-        ingestion_type=pipeline.ingestion_type.value,
-        status=pipeline.status.value,
-        target_database=pipeline.target_database,
-        target_schema=pipeline.target_schema,
-        target_table=pipeline.target_table,
-        created_at=pipeline.created_at.isoformat()
-    )
+    return ORJSONResponse(_pipeline_to_dict(pipeline))
 
 
 @router.get("/pipelines/{pipeline_id}/runs", response_model=List[PipelineRunResponse])
 def get_pipeline_runs(
     pipeline_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Get pipeline execution history."""
-    pipeline = db.query(Pipeline).filter(
-        Pipeline.id == pipeline_id,
-        Pipeline.user_id == current_user.id
-    ).first()
+    pipeline = db.get(Pipeline, pipeline_id)
     
-    if not pipeline:
+    if not pipeline or pipeline.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pipeline not found"
         )
     
-    runs = db.query(PipelineRun).filter(PipelineRun.pipeline_id == pipeline_id).order_by(PipelineRun.started_at.desc()).limit(100).all()
-    
-    return [
-        PipelineRunResponse(
-            id=r.id,
-            status=r.status.value,
-            started_at=r.started_at.isoformat(),
-            completed_at=r.completed_at.isoformat() if r.completed_at else None,
-            error_message=r.error_message,
-            rows_loaded=r.rows_loaded
+    rows = db.execute(
+        select(
+            PipelineRun.id,
+            PipelineRun.status,
+            PipelineRun.started_at,
+            PipelineRun.completed_at,
+            PipelineRun.error_message,
+            PipelineRun.rows_loaded
         )
-        for r in runs
-    ]
+        .where(PipelineRun.pipeline_id == pipeline_id)
+        .order_by(PipelineRun.started_at.desc())
+        .limit(100)
+    ).mappings().all()
+    
+    # Rows already match PipelineRunResponse; orjson encodes enums and datetimes directly
+    return ORJSONResponse([dict(row) for row in rows])
 
 
 @router.post("/pipelines/{pipeline_id}/run")
 def run_pipeline(
     pipeline_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Execute one-time pipeline."""
-    pipeline = db.query(Pipeline).filter(
-        Pipeline.id == pipeline_id,
-        Pipeline.user_id == current_user.id,
-        Pipeline.ingestion_type == IngestionType.ONE_TIME
-    ).first()
+    pipeline = db.get(Pipeline, pipeline_id)
     
-    if not pipeline:
+    if not pipeline or pipeline.user_id != current_user.id or pipeline.ingestion_type != IngestionType.ONE_TIME:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pipeline not found or not a one-time pipeline"
         )
     
     # Get connections
-    s3_conn = db.query(Connection).filter(Connection.id == pipeline.s3_connection_id).first()
-    sf_conn = db.query(Connection).filter(Connection.id == pipeline.snowflake_connection_id).first()
+    connections = _load_connections(db, pipeline.s3_connection_id, pipeline.snowflake_connection_id)
+    s3_conn = connections.get(pipeline.s3_connection_id)
+    sf_conn = connections.get(pipeline.snowflake_connection_id)
     
     # Create run record
     run = PipelineRun(
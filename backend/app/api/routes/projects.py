@@ -1,14 +1,17 @@
 """Project API endpoints with tenant isolation."""
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, ConfigDict
+from typing import Iterator, List, Optional, Dict, Any
 from datetime import datetime
+import orjson
 
-from app.db.session import get_db
-from app.api.models.database import User, Project, Tenant
-from app.api.routes.auth import get_current_user
-from app.core.tenant import get_user_tenant_id
+from app.db.session import get_db, SessionLocal
+from app.api.models.database import Project, Tenant
+from app.api.routes.auth import get_current_tenant_id
 
 router = APIRouter()
 
@@ -45,16 +48,15 @@ class ProjectUpdate(BaseModel):
 
 class ProjectResponse(BaseModel):
     """Response model for project."""
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     organization: str
     department: str
     project: str
     data_governance: Optional[Dict[str, Any]] = None
-    created_at: str
-    updated_at: str
-
-    class Config:
-        from_attributes = True
+    created_at: datetime
+    updated_at: datetime
 
 
 class GovernanceUpdate(BaseModel):
@@ -62,48 +64,95 @@ class GovernanceUpdate(BaseModel):
     data_governance: DataGovernance
 
 
+# ProjectResponse columns; projects never updated report created_at as updated_at
+_PROJECT_COLUMNS = (
+    Project.id,
+    Project.organization,
+    Project.department,
+    Project.project,
+    Project.data_governance,
+    Project.created_at,
+    func.coalesce(Project.updated_at, Project.created_at).label("updated_at"),
+)
+
+
+def _project_to_dict(project: Project) -> Dict[str, Any]:
+    """Build the ProjectResponse payload; orjson encodes the datetimes directly."""
+    return {
+        "id": project.id,
+        "organization": project.organization,
+        "department": project.department,
+        "project": project.project,
+        "data_governance": project.data_governance,
+        "created_at": project.created_at,
+        "updated_at": project.updated_at or project.created_at,
+    }
+
+
+def _stream_projects(query) -> Iterator[bytes]:
+    """Encode project rows as a JSON array, 500 rows per chunk, from a server-side cursor.
+
+    Runs while the response is being sent, after the request's session is closed,
+    so it reads through a session of its own.
+    """
+    db = SessionLocal()
+    try:
+        separator = b"["
+        for partition in db.execute(query.execution_options(yield_per=500)).mappings().partitions():
+            yield separator + b",".join(orjson.dumps(dict(row)) for row in partition)
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+    finally:
+        db.close()
+
+
+def _update_project(db: Session, project_id: int, tenant_id: int, values: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply values to a tenant's project and return its ProjectResponse payload.
+
+    One UPDATE ... RETURNING (a plain SELECT when there is nothing to change);
+    raises 404 if the project doesn't exist for the tenant.
+    """
+    scope = (Project.id == project_id, Project.tenant_id == tenant_id)
+    if values:
+        row = db.execute(
+            update(Project).where(*scope).values(**values).returning(*_PROJECT_COLUMNS)
+        ).mappings().first()
+        db.commit()
+    else:
+        row = db.execute(select(*_PROJECT_COLUMNS).where(*scope)).mappings().first()
+    
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Project not found"
+        )
+    return dict(row)
+
+
 @router.get("/projects", response_model=List[ProjectResponse])
 def list_projects(
     organization: Optional[str] = None,
     department: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id)
 ):
     """List projects for current tenant, optionally filtered by organization/department."""
-    tenant_id = get_user_tenant_id(current_user)
-    
-    query = db.query(Project).filter(Project.tenant_id == tenant_id)
+    query = select(*_PROJECT_COLUMNS).where(Project.tenant_id == tenant_id)
     
     if organization:
-        query = query.filter(Project.organization == organization)
+        query = query.where(Project.organization == organization)
     if department:
-        query = query.filter(Project.department == department)
+        query = query.where(Project.department == department)
     
-    projects = query.all()
-    
-    return [
-        ProjectResponse(
-            id=p.id,
-            organization=p.organization,
-            department=p.department,
-            project=p.project,
-            data_governance=p.data_governance,
-            created_at=p.created_at.isoformat(),
-            updated_at=p.updated_at.isoformat() if p.updated_at else p.created_at.isoformat()
-        )
-        for p in projects
-    ]
+    return StreamingResponse(_stream_projects(query), media_type="application/json")
 
 
 @router.get("/projects/{project_id}", response_model=ProjectResponse)
 def get_project(
     project_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Get project details with governance metadata."""
-    tenant_id = get_user_tenant_id(current_user)
-    
     project = db.query(Project).filter(
         Project.id == project_id,
         Project.tenant_id == tenant_id
@@ -115,145 +164,71 @@ def get_project(
             detail="Project not found"
         )
     
-    return ProjectResponse(
-        id=project.id,
-        organization=project.organization,
-        department=project.department,
-        project=project.project,
-        data_governance=project.data_governance,
-        created_at=project.created_at.isoformat(),
-        updated_at=project.updated_at.isoformat() if project.updated_at else project.created_at.isoformat()
-    )
+    return ORJSONResponse(_project_to_dict(project))
 
 
 @router.post("/projects", response_model=ProjectResponse)
 def create_project(
     project: ProjectCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Create a new project with governance metadata."""
-    tenant_id = get_user_tenant_id(current_user)
-    
-    # Check if project already exists
-    existing = db.query(Project).filter(
-        Project.tenant_id == tenant_id,
-        Project.organization == project.organization,
-        Project.department == project.department,
-        Project.project == project.project
-    ).first()
+    # Convert governance to dict if provided
+    governance_dict = None
+    if project.data_governance:
+        governance_dict = project.data_governance.model_dump(exclude_none=True)
+    
+    # uq_project_org_dept_proj does the duplicate check atomically: no row back means it exists
+    row = db.execute(
+        pg_insert(Project)
+        .values(
+            tenant_id=tenant_id,
+            organization=project.organization,
+            department=project.department,
+            project=project.project,
+            data_governance=governance_dict
+        )
+        .on_conflict_do_nothing(constraint="uq_project_org_dept_proj")
+        .returning(*_PROJECT_COLUMNS)
+    ).mappings().first()
     
-    if existing:
+    if row is None:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Project with this organization/department/project combination already exists"
         )
     
-    # Convert governance to dict if provided
-    governance_dict = None
-    if project.data_governance:
-        governance_dict = project.data_governance.dict(exclude_none=True)
-    
-    db_project = Project(
-        tenant_id=tenant_id,
-        organization=project.organization,
-        department=project.department,
-        project=project.project,
-        data_governance=governance_dict
-    )
-    
-    db.add(db_project)
     db.commit()
-    db.refresh(db_project)
     
-    return ProjectResponse(
-        id=db_project.id,
-        organization=db_project.organization,
-        department=db_project.department,
-        project=db_project.project,
-        data_governance=db_project.data_governance,
-        created_at=db_project.created_at.isoformat(),
-        updated_at=db_project.updated_at.isoformat() if db_project.updated_at else db_project.created_at.isoformat()
-    )
+    return ORJSONResponse(dict(row))
 
 
 @router.put("/projects/{project_id}", response_model=ProjectResponse)
 def update_project(
     project_id: int,
     project: ProjectUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Update project details."""
-    tenant_id = get_user_tenant_id(current_user)
-    
-    db_project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.tenant_id == tenant_id
-    ).first()
-    
-    if not db_project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-    
     # Update fields if provided
-    if project.organization is not None:
-        db_project.organization = project.organization
-    if project.department is not None:
-        db_project.department = project.department
-    if project.project is not None:
-        db_project.project = project.project
+    values = project.model_dump(include={"organization", "department", "project"}, exclude_none=True)
     if project.data_governance is not None:
-        db_project.data_governance = project.data_governance.dict(exclude_none=True)
+        values["data_governance"] = project.data_governance.model_dump(exclude_none=True)
     
-    db.commit()
-    db.refresh(db_project)
-    
-    return ProjectResponse(
-        id=db_project.id,
-        organization=db_project.organization,
-        department=db_project.department,
-        project=db_project.project,
-        data_governance=db_project.data_governance,
-        created_at=db_project.created_at.isoformat(),
-        updated_at=db_project.updated_at.isoformat() if db_project.updated_at else db_project.created_at.isoformat()
-    )
+    return ORJSONResponse(_update_project(db, project_id, tenant_id, values))
 
 
 @router.put("/projects/{project_id}/governance", response_model=ProjectResponse)
 def update_governance(
     project_id: int,
     governance: GovernanceUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    tenant_id: int = Depends(get_current_tenant_id),
+    db: Session = Depends(get_db, scope="function")
 ):
     """Update governance metadata for a project."""
-    tenant_id = get_user_tenant_id(current_user)
+    values = {"data_governance": governance.data_governance.model_dump(exclude_none=True)}
     
-    db_project = db.query(Project).filter(
-        Project.id == project_id,
-        Project.tenant_id == tenant_id
-    ).first()
-    
-    if not db_project:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Project not found"
-        )
-    
-    db_project.data_governance = governance.data_governance.dict(exclude_none=True)
-    db.commit()
-    db.refresh(db_project)
-    
-    return ProjectResponse(
-        id=db_project.id,
-        organization=db_project.organization,
-        department=db_project.department,
-        project=db_project.project,
-        data_governance=db_project.data_governance,
-        created_at=db_project.created_at.isoformat(),
-        updated_at=db_project.updated_at.isoformat() if db_project.updated_at else db_project.created_at.isoformat()
-    )
-
+    return ORJSONResponse(_update_project(db, project_id, tenant_id, values))
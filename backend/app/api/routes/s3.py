@@ -1,14 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Optional
-import json
+from typing import Dict, Iterator, List, Optional
+from itertools import chain, islice
+import orjson
 
 from app.db.session import get_db
 from app.api.models.database import User, Connection, ConnectionType
 from app.api.routes.auth import get_current_user
-from app.core.security import decrypt_data
-from app.services.s3_service import list_s3_files, preview_s3_file
+from app.core.security import decrypt_credentials
+from app.services.s3_service import iter_s3_files, preview_s3_file
 
 router = APIRouter()
 
@@ -32,11 +34,20 @@ class S3PreviewRequest(BaseModel):
     lines: int = 10
 
 
+def _stream_files(files: Iterator[Dict]) -> Iterator[bytes]:
+    """Encode file entries as a JSON array, 1000 entries (one S3 page) per chunk."""
+    separator = b"["
+    while batch := list(islice(files, 1000)):
+        yield separator + b",".join(orjson.dumps(f) for f in batch)
+        separator = b","
+    yield b"]"
+
+
 @router.post("/s3/list", response_model=List[S3FileResponse])
 def list_s3_objects(
     request: S3ListRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """List files in S3 bucket."""
     # Get connection
@@ -53,31 +64,34 @@ def list_s3_objects(
         )
     
     # Decrypt credentials
-    credentials_json = decrypt_data(connection.encrypted_credentials)
-    credentials = json.loads(credentials_json)
+    credentials = decrypt_credentials(connection.encrypted_credentials)
     
-    # List files
+    # List files; pull the first entry now so bad credentials or buckets still get a 400
+    files = iter_s3_files(
+        credentials['access_key_id'],
+        credentials['secret_access_key'],
+        request.bucket,
+        request.prefix,
+        credentials.get('region', 'us-east-1')
+    )
     try:
-        files = list_s3_files(
-            credentials['access_key_id'],
-            credentials['secret_access_key'],
-            request.bucket,
-            request.prefix,
-            credentials.get('region', 'us-east-1')
-        )
-        return [S3FileResponse(**file) for file in files]
+        first = next(files, None)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    
+    if first is None:
+        return []
+    return StreamingResponse(_stream_files(chain((first,), files)), media_type="application/json")
 
 
 @router.post("/s3/preview")
 def preview_s3_object(
     request: S3PreviewRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """Preview S3 file contents."""
     # Get connection
@@ -94,8 +108,7 @@ def preview_s3_object(
         )
     
     # Decrypt credentials
-    credentials_json = decrypt_data(connection.encrypted_credentials)
-    credentials = json.loads(credentials_json)
+    credentials = decrypt_credentials(connection.encrypted_credentials)
     
     # Preview file
     try:
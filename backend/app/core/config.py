@@ -1,13 +1,21 @@
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional
 
 
 class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, frozen=True)
+
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 3600  # Seconds before a pooled connection is replaced
     
     # Clerk
     CLERK_SECRET_KEY: str
+    CLERK_JWKS_URL: Optional[str] = None  # Enables token signature verification
     
     # Encryption
     ENCRYPTION_KEY: str
@@ -17,14 +25,22 @@ class Settings(BaseSettings):
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
     AWS_REGION: str = "us-east-1"
     
+    # Snowflake client tuning (applied to every connection the app opens)
+    SNOWFLAKE_CLIENT_PREFETCH_THREADS: int = 8  # Parallel result-chunk downloads per query
+    SNOWFLAKE_SESSION_KEEP_ALIVE: bool = True  # Heartbeat so pooled sessions don't expire
+    SNOWFLAKE_STORE_TEMPORARY_CREDENTIAL: bool = True
+    SNOWFLAKE_QUERY_TAG: str = "snowloader"
+    
     # API
     API_V1_STR: str = "/api"
     PROJECT_NAME: str = "Snowloader"
-    
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load settings (environment + .env) once per process."""
+    return Settings()
+
+
+settings = get_settings()
 
@@ -1,20 +1,69 @@
+import base64
+import os
+from functools import lru_cache
+from typing import Any, Dict, Union
+import orjson
 from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from app.core.config import settings
 
+# Ciphertexts written with AES-256-GCM carry this prefix; anything else is a legacy Fernet token
+_AESGCM_PREFIX = "v2:"
+_NONCE_SIZE = 12
 
+
+def _derive_aesgcm_key(encryption_key: str) -> bytes:
+    """Derive a dedicated AES-256 key from ENCRYPTION_KEY (a Fernet key)."""
+    return HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"snowloader-credentials-aesgcm",
+    ).derive(base64.urlsafe_b64decode(encryption_key))
+
+
+_aead = AESGCM(_derive_aesgcm_key(settings.ENCRYPTION_KEY))
+
+
+@lru_cache(maxsize=1)
 def get_encryption_cipher() -> Fernet:
-    """Get Fernet cipher for encrypting/decrypting credentials."""
+    """Get Fernet cipher for decrypting credentials stored before AES-GCM (built once)."""
     return Fernet(settings.ENCRYPTION_KEY.encode())
 
 
-def encrypt_data(data: str) -> str:
+def is_legacy_ciphertext(encrypted_data: str) -> bool:
+    """True for Fernet tokens written before the switch to AES-GCM."""
+    return not encrypted_data.startswith(_AESGCM_PREFIX)
+
+
+def encrypt_data(data: Union[str, bytes]) -> str:
     """Encrypt sensitive data."""
-    cipher = get_encryption_cipher()
-    return cipher.encrypt(data.encode()).decode()
+    if isinstance(data, str):
+        data = data.encode()
+    nonce = os.urandom(_NONCE_SIZE)
+    ciphertext = _aead.encrypt(nonce, data, None)
+    return _AESGCM_PREFIX + base64.urlsafe_b64encode(nonce + ciphertext).decode()
 
 
 def decrypt_data(encrypted_data: str) -> str:
     """Decrypt sensitive data."""
-    cipher = get_encryption_cipher()
-    return cipher.decrypt(encrypted_data.encode()).decode()
+    if not is_legacy_ciphertext(encrypted_data):
+        payload = base64.urlsafe_b64decode(encrypted_data[len(_AESGCM_PREFIX):])
+        return _aead.decrypt(payload[:_NONCE_SIZE], payload[_NONCE_SIZE:], None).decode()
+    return get_encryption_cipher().decrypt(encrypted_data.encode()).decode()
+
+
+@lru_cache(maxsize=1024)
+def _decrypt_credentials_cached(encrypted_data: str) -> Dict[str, Any]:
+    return orjson.loads(decrypt_data(encrypted_data))
+
+
+def decrypt_credentials(encrypted_data: str) -> Dict[str, Any]:
+    """Decrypt and parse stored connection credentials.
 
+    Cached by ciphertext; updating a connection re-encrypts its credentials,
+    so a changed row never hits a stale entry.
+    """
+    return dict(_decrypt_credentials_cached(encrypted_data))
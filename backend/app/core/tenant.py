@@ -1,7 +1,12 @@
 """Tenant utilities for multi-tenant isolation."""
+import threading
 from sqlalchemy.orm import Session
 from app.api.models.database import User, Tenant
-from typing import Optional
+from typing import Dict, Optional
+
+# tenant name -> tenants.id; tenants are never renamed or deleted, so ids stay valid
+_TENANT_ID_CACHE: Dict[str, int] = {}
+_TENANT_ID_CACHE_LOCK = threading.Lock()
 
 
 def get_user_tenant_id(user: User) -> int:
@@ -16,15 +21,23 @@ def get_or_create_default_tenant(db: Session, tenant_name: str = "Default Tenant
         tenant = Tenant(name=tenant_name)
         db.add(tenant)
         db.commit()
-        db.refresh(tenant)
+    with _TENANT_ID_CACHE_LOCK:
+        _TENANT_ID_CACHE[tenant_name] = tenant.id
     return tenant
 
 
+def get_default_tenant_id(db: Session, tenant_name: str = "Default Tenant") -> int:
+    """Get the default tenant's id, only hitting the database the first time per process."""
+    with _TENANT_ID_CACHE_LOCK:
+        tenant_id = _TENANT_ID_CACHE.get(tenant_name)
+    if tenant_id is None:
+        tenant_id = get_or_create_default_tenant(db, tenant_name).id
+    return tenant_id
+
+
 def ensure_user_has_tenant(user: User, db: Session) -> None:
     """Ensure user has a tenant assigned. If not, assign default tenant."""
     if not user.tenant_id:
-        tenant = get_or_create_default_tenant(db)
-        user.tenant_id = tenant.id
+        user.tenant_id = get_default_tenant_id(db)
         db.commit()
-        db.refresh(user)
 
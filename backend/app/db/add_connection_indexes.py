@@ -0,0 +1,28 @@
+"""Migration script to add ownership lookup indexes to existing connections table."""
+from sqlalchemy import text
+from app.db.session import engine
+
+
+def add_connection_indexes():
+    """Create composite indexes for per-user connection lookups."""
+    with engine.connect() as conn:
+        # Serves lookups by id scoped to the owning user, and list_connections
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_connection_user_id
+            ON connections(user_id, id)
+        """))
+        conn.commit()
+        print("Index idx_connection_user_id created/verified")
+
+        # Serves lookups restricted to one connection type (S3 / Snowflake)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_connection_user_type
+            ON connections(user_id, type)
+        """))
+        conn.commit()
+        print("Index idx_connection_user_type created/verified")
+
+
+if __name__ == "__main__":
+    add_connection_indexes()
+    print("\nMigration complete!")
@@ -0,0 +1,33 @@
+"""Migration script to add list-ordering and filter indexes to existing contracts table."""
+from sqlalchemy import text
+from app.db.session import engine
+
+
+def add_contract_indexes():
+    """Create indexes added after the contracts table was first created."""
+    with engine.connect() as conn:
+        # Serves list_contracts: tenant filter + ORDER BY created_at DESC
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_contract_tenant_created
+            ON contracts(tenant_id, created_at)
+        """))
+        conn.commit()
+        print("Index idx_contract_tenant_created created/verified")
+
+        # Serves organization / department / project hierarchy filters together
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_contract_tenant_org_dept_proj
+            ON contracts(tenant_id, organization, department, project_name)
+        """))
+        conn.commit()
+        print("Index idx_contract_tenant_org_dept_proj created/verified")
+
+        # Superseded by idx_contract_tenant_org_dept_proj, which has it as a prefix
+        conn.execute(text("DROP INDEX IF EXISTS idx_contract_tenant_org"))
+        conn.commit()
+        print("Index idx_contract_tenant_org dropped")
+
+
+if __name__ == "__main__":
+    add_contract_indexes()
+    print("\nMigration complete!")
@@ -0,0 +1,21 @@
+"""Migration script to add the run history index to existing pipeline_runs table."""
+from sqlalchemy import text
+from app.db.session import engine
+
+
+def add_pipeline_run_indexes():
+    """Create composite index for per-pipeline run history lookups."""
+    with engine.connect() as conn:
+        # Serves get_pipeline_runs (latest runs of one pipeline, newest first);
+        # Postgres walks the btree backwards for the DESC ordering
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_pipeline_run_pipeline_started
+            ON pipeline_runs(pipeline_id, started_at)
+        """))
+        conn.commit()
+        print("Index idx_pipeline_run_pipeline_started created/verified")
+
+
+if __name__ == "__main__":
+    add_pipeline_run_indexes()
+    print("\nMigration complete!")
@@ -0,0 +1,59 @@
+"""Migration script to add tenant_id column to existing connections table."""
+from sqlalchemy import text
+from app.db.session import engine
+
+
+def add_tenant_id_to_connections():
+    """Add tenant_id to connections, backfilled from the owning user's tenant."""
+    with engine.connect() as conn:
+        # Check if column exists
+        result = conn.execute(text("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name='connections' AND column_name='tenant_id'
+        """))
+        
+        if result.fetchone():
+            print("Column 'tenant_id' already exists in 'connections' table")
+        else:
+            # Add the column
+            print("Adding 'tenant_id' column to 'connections' table...")
+            conn.execute(text("""
+                ALTER TABLE connections 
+                ADD COLUMN tenant_id INTEGER REFERENCES tenants(id)
+            """))
+            conn.commit()
+            print("Successfully added 'tenant_id' column")
+        
+        # Backfill from users (run migrate_users_to_tenants first)
+        result = conn.execute(text("""
+            UPDATE connections c SET tenant_id = u.tenant_id
+            FROM users u
+            WHERE c.user_id = u.id AND c.tenant_id IS NULL
+        """))
+        conn.commit()
+        print(f"Backfilled tenant_id on {result.rowcount} connections")
+        
+        conn.execute(text("""
+            ALTER TABLE connections ALTER COLUMN tenant_id SET NOT NULL
+        """))
+        conn.commit()
+        print("connections.tenant_id set to NOT NULL")
+        
+        # Serves contract connection-name checks (name IN (...) within a tenant)
+        conn.execute(text("""
+            CREATE INDEX IF NOT EXISTS idx_connection_tenant_name
+            ON connections(tenant_id, name)
+        """))
+        conn.commit()
+        print("Index idx_connection_tenant_name created/verified")
+        
+        # Superseded by idx_connection_tenant_name
+        conn.execute(text("DROP INDEX IF EXISTS idx_connection_user_name"))
+        conn.commit()
+        print("Index idx_connection_user_name dropped")
+
+
+if __name__ == "__main__":
+    add_tenant_id_to_connections()
+    print("\nMigration complete!")
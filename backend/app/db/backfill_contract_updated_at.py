@@ -0,0 +1,24 @@
+"""Migration script to make contracts.updated_at always populated."""
+from sqlalchemy import text
+from app.db.session import engine
+
+
+def backfill_contract_updated_at():
+    """Backfill NULL updated_at from created_at and default it for new rows."""
+    with engine.connect() as conn:
+        result = conn.execute(text("""
+            UPDATE contracts SET updated_at = created_at WHERE updated_at IS NULL
+        """))
+        conn.commit()
+        print(f"Backfilled updated_at on {result.rowcount} contracts")
+
+        conn.execute(text("""
+            ALTER TABLE contracts ALTER COLUMN updated_at SET DEFAULT now()
+        """))
+        conn.commit()
+        print("Default for contracts.updated_at set")
+
+
+if __name__ == "__main__":
+    backfill_contract_updated_at()
+    print("\nMigration complete!")
@@ -1,4 +1,10 @@
 from sqlalchemy.ext.declarative import declarative_base
 
-Base = declarative_base()
 
+class _ModelBase:
+    # Fetch server-generated values (created_at / updated_at / started_at) in the
+    # flush's INSERT/UPDATE ... RETURNING, so committed objects need no refresh
+    __mapper_args__ = {"eager_defaults": True}
+
+
+Base = declarative_base(cls=_ModelBase)
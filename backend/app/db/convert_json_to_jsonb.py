@@ -0,0 +1,39 @@
+"""Migration script to convert existing JSON columns to JSONB."""
+from sqlalchemy import text
+from app.db.session import engine
+
+JSONB_COLUMNS = [
+    ("contracts", "contract_data"),
+    ("projects", "data_governance"),
+    ("pipelines", "config"),
+    ("pipeline_runs", "run_metadata"),
+]
+
+
+def convert_json_to_jsonb():
+    """Alter JSON columns to JSONB if they are not already."""
+    with engine.connect() as conn:
+        for table, column in JSONB_COLUMNS:
+            result = conn.execute(text("""
+                SELECT data_type
+                FROM information_schema.columns
+                WHERE table_name = :table AND column_name = :column
+            """), {"table": table, "column": column})
+            row = result.fetchone()
+
+            if not row:
+                print(f"Column '{column}' not found in '{table}' table, skipping")
+            elif row[0] == "jsonb":
+                print(f"Column '{table}.{column}' is already JSONB")
+            else:
+                print(f"Converting '{table}.{column}' to JSONB...")
+                conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"
+                ))
+                conn.commit()
+                print(f"Successfully converted '{table}.{column}'")
+
+
+if __name__ == "__main__":
+    convert_json_to_jsonb()
+    print("\nMigration complete!")
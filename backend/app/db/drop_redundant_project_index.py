@@ -0,0 +1,18 @@
+"""Migration script to drop the project index made redundant by the unique constraint."""
+from sqlalchemy import text
+from app.db.session import engine
+
+
+def drop_redundant_project_index():
+    """Drop idx_project_tenant_org; uq_project_org_dept_proj covers the same lookups."""
+    with engine.connect() as conn:
+        # uq_project_org_dept_proj is (tenant_id, organization, department, project), so its
+        # index already serves tenant, tenant+organization and tenant+organization+department
+        conn.execute(text("DROP INDEX IF EXISTS idx_project_tenant_org"))
+        conn.commit()
+        print("Index idx_project_tenant_org dropped")
+
+
+if __name__ == "__main__":
+    drop_redundant_project_index()
+    print("\nMigration complete!")
@@ -2,7 +2,7 @@
 from app.db.base import Base
 from app.db.session import engine
 # Import all models to ensure they're registered with Base.metadata
-from app.api.models.database import (
+from app.api.models import (
     User, Connection, Pipeline, PipelineRun,
     Tenant, Project, Contract
 )
@@ -1,4 +1,5 @@
 """Migration script to assign existing users to default tenant."""
+from sqlalchemy import update
 from app.db.session import SessionLocal
 from app.api.models.database import User, Tenant
 from app.core.tenant import get_or_create_default_tenant
@@ -11,17 +12,14 @@ def migrate_users_to_tenants():
         # Get or create default tenant
         tenant = get_or_create_default_tenant(db, "Default Tenant")
         
-        # Find users without tenant_id
-        users_without_tenant = db.query(User).filter(User.tenant_id == None).all()
+        # Assign every user without a tenant in one UPDATE
+        result = db.execute(
+            update(User).where(User.tenant_id.is_(None)).values(tenant_id=tenant.id)
+        )
+        db.commit()
         
-        if users_without_tenant:
-            print(f"Found {len(users_without_tenant)} users without tenant assignment")
-            for user in users_without_tenant:
-                user.tenant_id = tenant.id
-                print(f"  - Assigned user {user.email} (ID: {user.id}) to tenant '{tenant.name}'")
-            
-            db.commit()
-            print(f"\nSuccessfully assigned {len(users_without_tenant)} users to default tenant")
+        if result.rowcount:
+            print(f"Successfully assigned {result.rowcount} users to tenant '{tenant.name}'")
         else:
             print("All users already have tenant assignments")
         
@@ -0,0 +1,38 @@
+"""Migration script to store contracts in their validated (normalized) form."""
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.api.models.database import Contract
+from app.db.session import engine
+from app.services.contract_service import stored_contract_data, validate_contract
+
+
+def normalize_contract_data():
+    """Rewrite contract_data as validated, since stored contracts are loaded without validation.
+
+    Rows saved before contracts were normalized on write hold the raw request payload
+    (e.g. unstripped column names).
+    """
+    normalized = 0
+    invalid = []
+    with Session(engine) as session:
+        rows = session.execute(select(Contract.id, Contract.contract_data)).all()
+        for contract_id, contract_data in rows:
+            try:
+                data = stored_contract_data(validate_contract(contract_data))
+            except ValueError:
+                invalid.append(contract_id)
+                continue
+            if data != contract_data:
+                session.execute(
+                    update(Contract).where(Contract.id == contract_id).values(contract_data=data)
+                )
+                normalized += 1
+        session.commit()
+    print(f"Normalized contract_data on {normalized} of {len(rows)} contracts")
+    if invalid:
+        print(f"Contracts that no longer validate (left unchanged): {', '.join(map(str, invalid))}")
+
+
+if __name__ == "__main__":
+    normalize_contract_data()
+    print("\nMigration complete!")
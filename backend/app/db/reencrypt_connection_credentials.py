@@ -0,0 +1,34 @@
+"""Migration script to re-encrypt legacy Fernet connection credentials with AES-GCM."""
+from app.db.session import SessionLocal
+from app.api.models.database import Connection
+from app.core.security import decrypt_data, encrypt_data, is_legacy_ciphertext
+
+
+def reencrypt_connection_credentials():
+    """Rewrite every Fernet-encrypted connection credential blob as AES-GCM."""
+    db = SessionLocal()
+    try:
+        connections = db.query(Connection).all()
+        legacy = [c for c in connections if is_legacy_ciphertext(c.encrypted_credentials)]
+        
+        if legacy:
+            print(f"Found {len(legacy)} connections with legacy Fernet credentials")
+            for connection in legacy:
+                connection.encrypted_credentials = encrypt_data(decrypt_data(connection.encrypted_credentials))
+                print(f"  - Re-encrypted connection '{connection.name}' (ID: {connection.id})")
+            
+            db.commit()
+            print(f"\nSuccessfully re-encrypted {len(legacy)} connections")
+        else:
+            print("All connection credentials already use AES-GCM")
+        
+    except Exception as e:
+        db.rollback()
+        print(f"Error during migration: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    reencrypt_connection_credentials()
@@ -1,13 +1,35 @@
+import orjson
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _json_serializer(value) -> str:
+    """Serialize JSON/JSONB column values with orjson."""
+    return orjson.dumps(value).decode()
+
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+)
+# Committed objects keep their state (server defaults arrive via eager_defaults), so
+# building a response after commit doesn't re-SELECT every row
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 
 def get_db():
-    """Dependency for getting database session."""
+    """Dependency for getting database session.
+
+    Routes declare it with scope="function" so the session, and the pooled connection
+    it holds, is closed once the response is built instead of after it has been sent.
+    """
     db = SessionLocal()
     try:
         yield db
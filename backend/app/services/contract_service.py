@@ -1,45 +1,123 @@
 """Contract service for parsing, validating, and managing ingestion contracts."""
-import json
+import hashlib
+import threading
+import orjson
 import yaml
+from cachetools import LRUCache
 from typing import Dict, Optional, Any, List
 from pydantic import ValidationError
-from app.api.models.contract import IngestionContract
+from sqlalchemy import Text, cast, literal, select, union_all
+from app.api.models.contract import IngestionContract, get_type_adapter
 from app.api.models.database import Project, Connection
 from app.services.pipeline_service import detect_schema_from_file
-from app.core.security import decrypt_data
+from app.core.security import decrypt_credentials
+
+
+# libyaml-backed safe loader/dumper when PyYAML was built with it
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Validated contracts and rendered YAML, keyed by a hash of the contract payload.
+# IngestionContract is frozen, so cached instances are safe to share between requests.
+_VALIDATED_CONTRACTS: LRUCache = LRUCache(maxsize=2000)
+_CONTRACT_YAML: LRUCache = LRUCache(maxsize=2000)
+_CONTRACT_CACHE_LOCK = threading.Lock()
+
+
+def _contract_cache_key(contract_dict: Dict[str, Any]) -> Optional[bytes]:
+    """Stable content hash of a contract payload (key order does not matter).
+
+    None when orjson can't serialize the payload (e.g. an integer beyond 64 bits);
+    such payloads are handled uncached.
+    """
+    try:
+        payload = orjson.dumps(contract_dict, option=orjson.OPT_SORT_KEYS)
+    except TypeError:
+        return None
+    return hashlib.blake2b(payload, digest_size=16).digest()
 
 
 def parse_contract(contract_data: str, format: str = "yaml") -> Dict[str, Any]:
     """Parse contract from YAML or JSON string."""
     try:
         if format.lower() == "yaml":
-            return yaml.safe_load(contract_data)
+            return yaml.load(contract_data, Loader=_YAML_LOADER)
         elif format.lower() == "json":
-            return json.loads(contract_data)
+            return orjson.loads(contract_data)
         else:
             raise ValueError(f"Unsupported format: {format}. Must be 'yaml' or 'json'")
     except yaml.YAMLError as e:
         raise ValueError(f"Invalid YAML: {str(e)}")
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON: {str(e)}")
 
 
 def validate_contract(contract_dict: Dict[str, Any]) -> IngestionContract:
-    """Validate contract structure using Pydantic models."""
+    """Validate contract structure using Pydantic models.
+
+    Results are cached by payload content; the returned contract is frozen and shared.
+    """
+    key = _contract_cache_key(contract_dict)
+    if key is not None:
+        with _CONTRACT_CACHE_LOCK:
+            cached = _VALIDATED_CONTRACTS.get(key)
+        if cached is not None:
+            return cached
     try:
-        return IngestionContract(**contract_dict)
+        contract = get_type_adapter(IngestionContract).validate_python(contract_dict)
     except ValidationError as e:
         raise ValueError(f"Contract validation failed: {str(e)}")
+    if key is not None:
+        with _CONTRACT_CACHE_LOCK:
+            _VALIDATED_CONTRACTS[key] = contract
+    return contract
+
+
+def load_stored_contract(contract_data: Dict[str, Any]) -> IngestionContract:
+    """Load a contract persisted by this service (trusted DB payload — validation skipped)."""
+    try:
+        return IngestionContract.from_trusted(contract_data)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Stored contract is malformed: {str(e)}")
+
+
+def stored_contract_data(contract: IngestionContract) -> Dict[str, Any]:
+    """The payload to persist for a validated contract.
+
+    Stores the validated (normalized) values, which is what lets load_stored_contract skip
+    validation on read.
+    """
+    return contract.model_dump(mode="json", by_alias=True, exclude_none=True)
+
+
+def dump_yaml(data: Any) -> str:
+    """Serialize plain data (dicts, lists, scalars) to block-style YAML."""
+    return yaml.dump(data, Dumper=_YAML_DUMPER, default_flow_style=False, sort_keys=False)
 
 
 def contract_to_yaml(contract: IngestionContract) -> str:
     """Convert contract to YAML string."""
-    return yaml.dump(contract.dict(exclude_none=True), default_flow_style=False, sort_keys=False)
+    return dump_yaml(contract.model_dump(mode="json", exclude_none=True))
+
+
+def stored_contract_to_yaml(contract_data: Dict[str, Any]) -> str:
+    """Render a stored contract as YAML, cached by payload content."""
+    key = _contract_cache_key(contract_data)
+    if key is not None:
+        with _CONTRACT_CACHE_LOCK:
+            cached = _CONTRACT_YAML.get(key)
+        if cached is not None:
+            return cached
+    rendered = contract_to_yaml(load_stored_contract(contract_data))
+    if key is not None:
+        with _CONTRACT_CACHE_LOCK:
+            _CONTRACT_YAML[key] = rendered
+    return rendered
 
 
 def contract_to_json(contract: IngestionContract) -> str:
     """Convert contract to JSON string."""
-    return json.dumps(contract.dict(exclude_none=True), indent=2)
+    return orjson.dumps(contract.model_dump(mode="json", exclude_none=True), option=orjson.OPT_INDENT_2).decode()
 
 
 def detect_schema_from_sample(
@@ -51,19 +129,17 @@ def detect_schema_from_sample(
     tenant_id: int
 ) -> List[Dict[str, Any]]:
     """Detect schema from a sample file using existing pipeline service."""
-    from app.api.models.database import User
     # Get connection and validate tenant ownership
-    connection = db_session.query(Connection).join(User).filter(
+    connection = db_session.query(Connection).filter(
         Connection.id == connection_id,
-        User.tenant_id == tenant_id
+        Connection.tenant_id == tenant_id
     ).first()
     
     if not connection:
         raise ValueError(f"Connection {connection_id} not found or not accessible")
     
     # Decrypt credentials
-    creds_json = decrypt_data(connection.encrypted_credentials)
-    creds = json.loads(creds_json)
+    creds = decrypt_credentials(connection.encrypted_credentials)
     
     # Get region (default to us-east-1 for S3)
     region = creds.get('region', 'us-east-1')
@@ -95,61 +171,55 @@ def resolve_environment_config(
     return contract.get_environment_config(environment)
 
 
-def validate_project_reference(
-    project_id: Optional[int],
-    tenant_id: int,
-    db_session
-) -> Optional[Project]:
-    """Validate that project exists and belongs to the tenant."""
-    if project_id is None:
-        return None
-    
-    project = db_session.query(Project).filter(
-        Project.id == project_id,
-        Project.tenant_id == tenant_id
-    ).first()
-    
-    if not project:
-        raise ValueError(f"Project {project_id} not found or not accessible")
-    
-    return project
+def _referenced_connection_names(contract: IngestionContract) -> set:
+    """Collect the connection names referenced by a contract's source and target configs."""
+    return {
+        env_config.connection_name
+        for section in (contract.source, contract.target)
+        for env_config in (section.default, section.dev, section.uat, section.prod)
+        if env_config
+    }
 
 
-def validate_connection_names(
-    contract: IngestionContract,
+def preflight_contract(
+    contract_data: Dict[str, Any],
+    project_id: Optional[int],
     tenant_id: int,
     db_session
-) -> Dict[str, bool]:
-    """Validate that all referenced connection names exist for the tenant."""
-    connection_names = set()
-    
-    # Collect all connection names from source configs
-    connection_names.add(contract.source.default.connection_name)
-    if contract.source.dev:
-        connection_names.add(contract.source.dev.connection_name)
-    if contract.source.uat:
-        connection_names.add(contract.source.uat.connection_name)
-    if contract.source.prod:
-        connection_names.add(contract.source.prod.connection_name)
+) -> IngestionContract:
+    """Validate a contract and its project / connection references before it is saved.
+
+    Both reference checks share one UNION ALL query. Raises ValueError describing
+    every problem found.
+    """
+    try:
+        contract = validate_contract(contract_data)
+    except ValueError as e:
+        raise ValueError(f"Invalid contract structure: {str(e)}")
     
-    # Collect all connection names from target configs
-    connection_names.add(contract.target.default.connection_name)
-    if contract.target.dev:
-        connection_names.add(contract.target.dev.connection_name)
-    if contract.target.uat:
-        connection_names.add(contract.target.uat.connection_name)
-    if contract.target.prod:
-        connection_names.add(contract.target.prod.connection_name)
+    connection_names = _referenced_connection_names(contract)
+    found = select(literal("connection").label("kind"), Connection.name.label("key")).where(
+        Connection.name.in_(connection_names),
+        Connection.tenant_id == tenant_id
+    )
+    if project_id:
+        found = union_all(
+            found,
+            select(literal("project"), cast(Project.id, Text)).where(
+                Project.id == project_id,
+                Project.tenant_id == tenant_id
+            )
+        )
+    rows = db_session.execute(found).all()
     
-    # Check each connection exists for the tenant
-    from app.api.models.database import User
-    results = {}
-    for conn_name in connection_names:
-        connection = db_session.query(Connection).join(User).filter(
-            Connection.name == conn_name,
-            User.tenant_id == tenant_id
-        ).first()
-        results[conn_name] = connection is not None
+    errors = []
+    if project_id and ("project", str(project_id)) not in rows:
+        errors.append(f"Project {project_id} not found or not accessible")
+    existing = {key for kind, key in rows if kind == "connection"}
+    missing_connections = sorted(connection_names - existing)
+    if missing_connections:
+        errors.append(f"Connection names not found: {', '.join(missing_connections)}")
+    if errors:
+        raise ValueError("; ".join(errors))
     
-    return results
-
+    return contract
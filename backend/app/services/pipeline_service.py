@@ -1,64 +1,303 @@
-import json
+import csv
+import posixpath
+import re
 import time
-from typing import Dict, Optional, Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, time as dt_time
+from itertools import islice
+from typing import Dict, Optional, Any, Tuple
 from app.services.snowflake_service import (
-    get_snowflake_connection,
-    create_table_from_schema,
-    create_external_stage,
-    create_snowpipe,
+    pooled_metadata_connection,
+    pooled_snowflake_connection,
+    provision_pipeline,
     get_snowpipe_sqs_arn,
     copy_into_table,
     execute_sql
 )
-from app.services.s3_service import get_s3_client, preview_s3_file, create_s3_event_notification
-from app.core.security import decrypt_data
+from app.services.s3_service import read_s3_lines, create_s3_event_notification
+from app.core.security import decrypt_credentials
 from app.api.models.database import Connection, ConnectionType, IngestionType
 
 
+# Extension -> load format; anything unrecognised is treated as CSV
+_EXT_TO_FORMAT = {
+    '.json': 'JSON',
+    '.jsonl': 'JSON',
+    '.ndjson': 'JSON',
+    '.csv': 'CSV',
+    '.parquet': 'PARQUET',
+    '.pq': 'PARQUET',
+}
+
+# Compression suffixes COPY INTO detects on its own (COMPRESSION = AUTO); the format is the inner extension
+_COMPRESSION_EXTS = frozenset({'.gz', '.bz2', '.zst', '.br', '.deflate'})
+
+
 def detect_file_format_from_path(file_path: str) -> str:
-    """Detect file format from file extension."""
-    file_path_lower = file_path.lower()
-    if file_path_lower.endswith('.json') or file_path_lower.endswith('.jsonl'):
-        return "JSON"
-    elif file_path_lower.endswith('.csv'):
-        return "CSV"
-    elif file_path_lower.endswith('.parquet'):
-        return "PARQUET"
-    else:
-        # Default to CSV for unknown extensions
-        return "CSV"
+    """Detect file format from file extension (e.g. data.csv.gz is CSV)."""
+    root, ext = posixpath.splitext(file_path)
+    ext = ext.lower()
+    if ext in _COMPRESSION_EXTS:
+        ext = posixpath.splitext(root)[1].lower()
+    return _EXT_TO_FORMAT.get(ext, 'CSV')
+
+
+# Characters not allowed in an unquoted Snowflake identifier
+_NON_IDENTIFIER_RE = re.compile(r"[^0-9A-Za-z_]")
+
+
+def default_table_name(s3_path: str) -> str:
+    """Derive a table name from the file name (without extension) of an S3 path."""
+    table_name = _NON_IDENTIFIER_RE.sub('_', s3_path.rpartition('/')[2].rsplit('.', 1)[0])
+    if not table_name or table_name[0].isdigit():
+        table_name = f"TABLE_{table_name}"
+    return table_name
+
+
+# Fixed layout for JSON loads: the document goes into a VARIANT column next to file metadata
+_JSON_COLUMNS = [
+    {"name": "raw_data", "type": "VARIANT", "nullable": True},
+    {"name": "metadata_filename", "type": "VARCHAR", "nullable": True},
+    {"name": "metadata_file_row_number", "type": "NUMBER", "nullable": True},
+    {"name": "metadata_file_content_key", "type": "VARCHAR", "nullable": True},
+    {"name": "metadata_file_last_modified", "type": "TIMESTAMP_NTZ", "nullable": True},
+]
+
+
+# Type lattice for CSV inference, narrowest first. NUMBER and FLOAT widen into FLOAT;
+# TIMESTAMP (no zone) and TIMESTAMP_TZ (Z or an offset) widen into TIMESTAMP_TZ, since NTZ
+# would silently drop the offsets; any other mix widens to VARCHAR, which is also what
+# all-empty columns end up as.
+_UNKNOWN, _NUMBER, _FLOAT, _TIMESTAMP, _TIMESTAMP_TZ, _VARCHAR = range(6)
+_SNOWFLAKE_TYPES = {
+    _UNKNOWN: "VARCHAR",
+    _NUMBER: "NUMBER",
+    _FLOAT: "FLOAT",
+    _TIMESTAMP: "TIMESTAMP_NTZ",
+    _TIMESTAMP_TZ: "TIMESTAMP_TZ",
+    _VARCHAR: "VARCHAR",
+}
+
+# No leading zeros (ids and zip codes stay VARCHAR) and within NUMBER(38)'s precision
+_INT_RE = re.compile(r"[+-]?(?:0|[1-9][0-9]{0,37})")
+_FLOAT_RE = re.compile(r"[+-]?(?:(?:0|[1-9][0-9]*)(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?")
+_TIMESTAMP_RE = re.compile(
+    r"(?P<date>[0-9]{4}-[0-9]{2}-[0-9]{2})"
+    r"(?:[ T](?P<time>[0-9]{2}:[0-9]{2}(?::[0-9]{2}(?:\.[0-9]{1,9})?)?))?"
+    r"(?P<zone>Z|[+-](?P<offset_hours>[0-9]{2}):?(?P<offset_minutes>[0-9]{2}))?"
+)
+
+DEFAULT_SAMPLE_ROWS = 1000
+
+
+def _infer_value_type(value: str) -> int:
+    """Narrowest lattice type for a single (already trimmed, non-empty) CSV value."""
+    if _INT_RE.fullmatch(value):
+        return _NUMBER
+    if _FLOAT_RE.fullmatch(value):
+        return _FLOAT
+    match = _TIMESTAMP_RE.fullmatch(value)
+    if match and _is_valid_timestamp(match):
+        return _TIMESTAMP_TZ if match["zone"] else _TIMESTAMP
+    return _VARCHAR
+
+
+def _is_valid_timestamp(match: re.Match) -> bool:
+    """Range-check every component the regex matched, so e.g. 25:99 isn't typed as a timestamp."""
+    try:
+        date.fromisoformat(match["date"])
+        if match["time"]:
+            # HH:MM[:SS]; the fraction is already just digits
+            dt_time.fromisoformat(match["time"][:8])
+    except ValueError:
+        return False
+    return match["offset_hours"] is None or (
+        int(match["offset_hours"]) < 24 and int(match["offset_minutes"]) < 60
+    )
+
+
+def _widen(current: int, observed: int) -> int:
+    """Join two lattice types."""
+    if current == observed or current == _UNKNOWN:
+        return observed
+    if current in (_NUMBER, _FLOAT) and observed in (_NUMBER, _FLOAT):
+        return _FLOAT
+    if current in (_TIMESTAMP, _TIMESTAMP_TZ) and observed in (_TIMESTAMP, _TIMESTAMP_TZ):
+        return _TIMESTAMP_TZ
+    return _VARCHAR
+
+
+def _column_name(header: str) -> str:
+    """Turn a CSV header into an unquoted Snowflake identifier (quoted headers may hold commas)."""
+    return _NON_IDENTIFIER_RE.sub('_', header.strip())
+
+
+def _csv_columns(lines: list, sample_rows: int = DEFAULT_SAMPLE_ROWS, complete: bool = True) -> list:
+    """Build CSV columns from previewed lines (header row first).
+
+    Types are inferred from at most sample_rows data rows, stopping early once every
+    column has widened to VARCHAR. Empty values (loaded as NULL) don't affect the type.
+    When the lines are not the complete file every column is VARCHAR: a type that only
+    fits the sample would fail the whole COPY on the first row past it.
+    """
+    if not lines:
+        raise Exception("File is empty")
+    
+    # Same dialect as the COPY INTO file format: comma-delimited, optionally '"'-quoted, TRIM_SPACE
+    rows = csv.reader(lines, skipinitialspace=True)
+    headers = next(rows)
+    types = [_UNKNOWN if complete else _VARCHAR] * len(headers)
+    settled = 0
+    
+    for row in islice(rows, sample_rows if complete else 0):
+        for i, value in enumerate(row[:len(types)]):
+            value = value.strip()
+            if not value or types[i] == _VARCHAR:
+                continue
+            types[i] = _widen(types[i], _infer_value_type(value))
+            if types[i] == _VARCHAR:
+                settled += 1
+        if settled == len(types):
+            break
+    
+    return [
+        {"name": _column_name(h), "type": _SNOWFLAKE_TYPES[t], "nullable": True}
+        for h, t in zip(headers, types)
+    ]
 
 
-def detect_schema_from_file(access_key_id: str, secret_access_key: str, bucket: str, key: str, region: str, file_type: str = "CSV") -> list:
-    """Detect schema from S3 file."""
+def detect_schema_from_file(
+    access_key_id: str,
+    secret_access_key: str,
+    bucket: str,
+    key: str,
+    region: str,
+    file_type: str = "CSV",
+    sample_rows: int = DEFAULT_SAMPLE_ROWS
+) -> list:
+    """Detect schema from S3 file, inferring CSV column types when the file fits in sample_rows rows."""
     if file_type.upper() == "CSV":
-        # Preview first few lines to detect schema
-        lines = preview_s3_file(
-            access_key_id, secret_access_key, bucket, key, region, lines=5
+        # Preview the header plus the sampled rows (one bounded ranged read)
+        lines, complete = read_s3_lines(
+            access_key_id, secret_access_key, bucket, key, region, lines=sample_rows + 1
         )
-        if not lines:
-            raise Exception("File is empty")
-        
-        # Simple CSV schema detection
-        headers = lines[0].split(',')
-        # For MVP, assume all columns are VARCHAR
-        columns = [{"name": h.strip().replace(' ', '_'), "type": "VARCHAR", "nullable": True} for h in headers]
-        return columns
+        return _csv_columns(lines, sample_rows, complete)
     elif file_type.upper() == "JSON":
         # For JSON, we create a table with VARIANT column + metadata columns
         # The actual JSON structure will be stored in the VARIANT column
-        columns = [
-            {"name": "raw_data", "type": "VARIANT", "nullable": True},
-            {"name": "metadata_filename", "type": "VARCHAR", "nullable": True},
-            {"name": "metadata_file_row_number", "type": "NUMBER", "nullable": True},
-            {"name": "metadata_file_content_key", "type": "VARCHAR", "nullable": True},
-            {"name": "metadata_file_last_modified", "type": "TIMESTAMP_NTZ", "nullable": True},
-        ]
-        return columns
+        return [dict(column) for column in _JSON_COLUMNS]
     else:
         raise Exception(f"File type {file_type} not yet supported")
 
 
+def sniff_file(
+    access_key_id: str,
+    secret_access_key: str,
+    bucket: str,
+    key: str,
+    region: str,
+    sample_rows: int = DEFAULT_SAMPLE_ROWS
+) -> Tuple[str, list]:
+    """Detect a file's format and columns with at most one ranged read.
+
+    JSON and Parquet extensions are trusted without reading the file. Anything else is
+    previewed once: content starting with '{' or '[' is JSON, otherwise it is parsed as CSV.
+    """
+    file_format = detect_file_format_from_path(key)
+    if file_format != "CSV":
+        return file_format, detect_schema_from_file(access_key_id, secret_access_key, bucket, key, region, file_format)
+    
+    lines, complete = read_s3_lines(access_key_id, secret_access_key, bucket, key, region, lines=sample_rows + 1)
+    first_line = next((line.lstrip() for line in lines if line.strip()), "")
+    if first_line[:1] in ("{", "["):
+        return "JSON", [dict(column) for column in _JSON_COLUMNS]
+    return "CSV", _csv_columns(lines, sample_rows, complete)
+
+
+@dataclass(frozen=True, slots=True)
+class S3Creds:
+    """Decrypted S3 connection credentials."""
+    access_key_id: str
+    secret_access_key: str
+    region: str = 'us-east-1'
+
+    @classmethod
+    def from_connection(cls, connection: Connection) -> "S3Creds":
+        creds = decrypt_credentials(connection.encrypted_credentials)
+        return cls(creds['access_key_id'], creds['secret_access_key'], creds.get('region', 'us-east-1'))
+
+    def stage_credentials(self) -> Dict[str, str]:
+        return {'access_key_id': self.access_key_id, 'secret_access_key': self.secret_access_key}
+
+
+@dataclass(frozen=True, slots=True)
+class SnowflakeCreds:
+    """Decrypted Snowflake connection credentials."""
+    account: str
+    user: str
+    password: str
+    warehouse: Optional[str] = None
+    database: Optional[str] = None
+    schema: Optional[str] = None
+    role: Optional[str] = None
+
+    @classmethod
+    def from_connection(cls, connection: Connection) -> "SnowflakeCreds":
+        creds = decrypt_credentials(connection.encrypted_credentials)
+        return cls(
+            creds['account'],
+            creds['user'],
+            creds['password'],
+            creds.get('warehouse'),
+            creds.get('database'),
+            creds.get('schema'),
+            creds.get('role')
+        )
+
+    def connect(self, database: Optional[str], schema: Optional[str]):
+        """Borrow a pooled connection; database and schema fall back to the connection's defaults."""
+        return pooled_snowflake_connection(
+            self.account,
+            self.user,
+            self.password,
+            self.warehouse,
+            database or self.database,
+            schema or self.schema,
+            self.role
+        )
+
+    def connect_metadata(self):
+        """Borrow a pooled warehouse-less connection, for DDL and SHOW/DESC only."""
+        return pooled_metadata_connection(self.account, self.user, self.password, self.role)
+
+
+# Runs schema detection concurrently with the Snowflake connect in create_one_time_pipeline
+_SCHEMA_DETECTION_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="schema-detection")
+
+
+def _detect_file_columns(s3_creds: S3Creds, bucket: str, key: str, file_format: Optional[str], sample_rows: int) -> Tuple[str, list]:
+    """Detect (format, columns) of a file; without an explicit format, sniff it from the same read."""
+    if file_format:
+        return file_format, detect_schema_from_file(
+            s3_creds.access_key_id,
+            s3_creds.secret_access_key,
+            bucket,
+            key,
+            s3_creds.region,
+            file_format,
+            sample_rows
+        )
+    return sniff_file(
+        s3_creds.access_key_id,
+        s3_creds.secret_access_key,
+        bucket,
+        key,
+        s3_creds.region,
+        sample_rows
+    )
+
+
 def create_one_time_pipeline(
     s3_connection: Connection,
     snowflake_connection: Connection,
@@ -68,85 +307,58 @@ def create_one_time_pipeline(
     target_schema: str,
     target_table: str,
     file_format: Optional[str] = None,
-    copy_options: Optional[Dict] = None
+    copy_options: Optional[Dict] = None,
+    sample_rows: int = DEFAULT_SAMPLE_ROWS
 ) -> Dict:
     """Create and execute one-time ingestion pipeline."""
-    # Auto-detect file format if not provided
-    if not file_format:
-        file_format = detect_file_format_from_path(s3_path)
+    # Split the path once: the stage points at its directory, COPY INTO names the file
+    s3_prefix, separator, file_name = s3_path.rpartition('/')
     
-    # Auto-generate table name if not provided (use file name without extension)
+    # Auto-generate table name if not provided
     if not target_table or target_table.strip() == "":
-        file_name = s3_path.split('/')[-1]
-        target_table = file_name.rsplit('.', 1)[0].replace('-', '_').replace(' ', '_')
-        # Ensure valid Snowflake identifier
-        target_table = ''.join(c if c.isalnum() or c == '_' else '_' for c in target_table)
-        if not target_table or target_table[0].isdigit():
-            target_table = f"TABLE_{target_table}"
+        target_table = default_table_name(file_name)
     
     # Decrypt credentials
-    s3_creds_json = decrypt_data(s3_connection.encrypted_credentials)
-    s3_creds = json.loads(s3_creds_json)
+    s3_creds = S3Creds.from_connection(s3_connection)
     
-    sf_creds_json = decrypt_data(snowflake_connection.encrypted_credentials)
-    sf_creds = json.loads(sf_creds_json)
+    sf_creds = SnowflakeCreds.from_connection(snowflake_connection)
     
-    # Get S3 client
-    s3_client = get_s3_client(
-        s3_creds['access_key_id'],
-        s3_creds['secret_access_key'],
-        s3_creds.get('region', 'us-east-1')
-    )
-    
-    # Detect schema from file
-    columns = detect_schema_from_file(
-        s3_creds['access_key_id'],
-        s3_creds['secret_access_key'],
-        s3_bucket,
-        s3_path,
-        s3_creds.get('region', 'us-east-1'),
-        file_format
-    )
+    # JSON loads into the fixed VARIANT layout, so its schema needs no S3 read at all
+    if (file_format or detect_file_format_from_path(s3_path)).upper() == "JSON":
+        detection = None
+        file_format, columns = "JSON", _JSON_COLUMNS
+    else:
+        # Detecting the schema reads from S3 and doesn't need Snowflake: run it on a worker
+        # thread while the Snowflake connection is being checked out
+        detection = _SCHEMA_DETECTION_EXECUTOR.submit(
+            _detect_file_columns, s3_creds, s3_bucket, s3_path, file_format, sample_rows
+        )
     
     # Connect to Snowflake
     # Use provided target_database and target_schema, or fall back to connection defaults
-    conn = get_snowflake_connection(
-        sf_creds['account'],
-        sf_creds['user'],
-        sf_creds['password'],
-        sf_creds.get('warehouse'),
-        target_database or sf_creds.get('database'),
-        target_schema or sf_creds.get('schema'),
-        sf_creds.get('role')
-    )
-    
-    try:
-        # Create table if not exists
-        create_table_from_schema(conn, target_database, target_schema, target_table, columns)
+    with sf_creds.connect(target_database, target_schema) as conn:
+        if detection is not None:
+            file_format, columns = detection.result()
         
-        # Create external stage pointing to S3
-        # Extract the directory path from the S3 path
-        if '/' in s3_path:
-            s3_prefix = '/'.join(s3_path.split('/')[:-1])
+        # Create table if not exists and an external stage pointing to S3, in one round trip
+        if separator:
             s3_url = f"s3://{s3_bucket}/{s3_prefix}/"
         else:
             s3_url = f"s3://{s3_bucket}/"
         
         stage_name = f"STAGE_{target_table}"
-        create_external_stage(
+        provision_pipeline(
             conn,
             target_database,
             target_schema,
+            target_table,
+            columns,
             stage_name,
             s3_url,
-            {
-                'access_key_id': s3_creds['access_key_id'],
-                'secret_access_key': s3_creds['secret_access_key']
-            }
+            s3_creds.stage_credentials()
         )
         
         # Execute COPY INTO
-        file_name = s3_path.split('/')[-1]
         copy_result = copy_into_table(conn, target_database, target_schema, target_table, stage_name, file_name, file_format, copy_options)
         
         return {
@@ -154,8 +366,6 @@ def create_one_time_pipeline(
             "rows_loaded": copy_result.get("rows_loaded", 0),
             "table_name": target_table  # Return the table name (may have been auto-generated)
         }
-    finally:
-        conn.close()
 
 
 def create_snowpipe_pipeline(
@@ -183,64 +393,33 @@ def create_snowpipe_pipeline(
         raise Exception("Snowpipe currently only supports JSON file format")
     
     # Decrypt credentials
-    s3_creds_json = decrypt_data(s3_connection.encrypted_credentials)
-    s3_creds = json.loads(s3_creds_json)
+    s3_creds = S3Creds.from_connection(s3_connection)
     
-    sf_creds_json = decrypt_data(snowflake_connection.encrypted_credentials)
-    sf_creds = json.loads(sf_creds_json)
+    sf_creds = SnowflakeCreds.from_connection(snowflake_connection)
     
     # Connect to Snowflake
-    # Use provided target_database and target_schema, or fall back to connection defaults
-    conn = get_snowflake_connection(
-        sf_creds['account'],
-        sf_creds['user'],
-        sf_creds['password'],
-        sf_creds.get('warehouse'),
-        target_database or sf_creds.get('database'),
-        target_schema or sf_creds.get('schema'),
-        sf_creds.get('role')
-    )
-    
-    try:
-        # Create table with JSON schema (VARIANT + metadata columns)
-        columns = [
-            {"name": "raw_data", "type": "VARIANT", "nullable": True},
-            {"name": "metadata_filename", "type": "VARCHAR", "nullable": True},
-            {"name": "metadata_file_row_number", "type": "NUMBER", "nullable": True},
-            {"name": "metadata_file_content_key", "type": "VARCHAR", "nullable": True},
-            {"name": "metadata_file_last_modified", "type": "TIMESTAMP_NTZ", "nullable": True}
-        ]
-        create_table_from_schema(conn, target_database, target_schema, target_table, columns)
-        
-        # Create external stage
+    # Everything below is DDL or DESC on fully qualified names, so no warehouse is needed
+    with sf_creds.connect_metadata() as conn:
         # Normalize S3 URL - ensure prefix doesn't have leading slash, add trailing slash if prefix provided
         normalized_prefix = s3_prefix.strip('/')
         if normalized_prefix and not normalized_prefix.endswith('/'):
             normalized_prefix += '/'
         s3_url = f"s3://{s3_bucket}/{normalized_prefix}" if normalized_prefix else f"s3://{s3_bucket}/"
         
+        # Create the table with JSON schema (VARIANT + metadata columns), the external stage
+        # and the Snowpipe with AUTO_INGEST = TRUE in a single multi-statement request
         stage_name = f"STAGE_{target_table}"
-        create_external_stage(
-            conn,
-            target_database,
-            target_schema,
-            stage_name,
-            s3_url,
-            {
-                'access_key_id': s3_creds['access_key_id'],
-                'secret_access_key': s3_creds['secret_access_key']
-            }
-        )
-        
-        # Create Snowpipe with AUTO_INGEST = TRUE
         full_pipe_name = f"{target_database}.{target_schema}.{pipe_name}"
-        create_snowpipe(
+        provision_pipeline(
             conn,
             target_database,
             target_schema,
-            pipe_name,
+            target_table,
+            _JSON_COLUMNS,
             stage_name,  # Just the stage name, not fully qualified - function adds database.schema prefix
-            target_table,  # Just the table name, not fully qualified - function adds database.schema prefix
+            s3_url,
+            s3_creds.stage_credentials(),
+            pipe_name,
             file_format,
             copy_options
         )
@@ -263,12 +442,12 @@ def create_snowpipe_pipeline(
         
         # Create S3 event notification
         event_result = create_s3_event_notification(
-            s3_creds['access_key_id'],
-            s3_creds['secret_access_key'],
+            s3_creds.access_key_id,
+            s3_creds.secret_access_key,
             s3_bucket,
             normalized_prefix,
             sqs_arn,
-            s3_creds.get('region', 'us-east-1')
+            s3_creds.region
         )
         
         return {
@@ -277,6 +456,4 @@ def create_snowpipe_pipeline(
             "sqs_arn": sqs_arn,
             "event_notification": event_result
         }
-    finally:
-        conn.close()
 
@@ -1,25 +1,97 @@
+import hashlib
+import threading
+import zlib
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
-from typing import List, Dict, Optional
+from cachetools import LRUCache
+from typing import Iterator, List, Dict, Optional, Tuple
+
+# One session for the process so the S3 service model is loaded once;
+# client creation from a shared session is not thread-safe, hence the lock
+_session = boto3.session.Session()
+_session_lock = threading.Lock()
+
+# Cached clients are shared by every threadpool worker serving sync routes, so size the
+# per-client HTTPS pool above botocore's default of 10 to avoid queueing on it
+_CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    retries={"max_attempts": 3, "mode": "standard"},
+    tcp_keepalive=True
+)
+
+
+class _S3ClientCache(LRUCache):
+    """LRU of S3 clients that closes a client's connection pool when it is evicted."""
+
+    def popitem(self):
+        key, client = super().popitem()
+        client.close()
+        return key, client
+
+
+# (access_key_id, sha256(secret_access_key), region) -> client
+_clients = _S3ClientCache(maxsize=64)
+
+
+def _client_key(access_key_id: str, secret_access_key: str, region: str) -> tuple:
+    return access_key_id, hashlib.sha256(secret_access_key.encode()).digest(), region
 
 
 def get_s3_client(access_key_id: str, secret_access_key: str, region: str):
-    """Create S3 client with credentials."""
-    return boto3.client(
-        's3',
-        aws_access_key_id=access_key_id,
-        aws_secret_access_key=secret_access_key,
-        region_name=region
-    )
+    """Get an S3 client for the credentials, reusing it (and its HTTPS pool) across calls."""
+    key = _client_key(access_key_id, secret_access_key, region)
+    with _session_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _session.client(
+                's3',
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+                region_name=region,
+                config=_CLIENT_CONFIG
+            )
+            _clients[key] = client
+        return client
+
+
+def evict_s3_client(access_key_id: str, secret_access_key: str, region: str) -> None:
+    """Drop and close the cached client for credentials that are being removed."""
+    with _session_lock:
+        client = _clients.pop(_client_key(access_key_id, secret_access_key, region), None)
+    if client is not None:
+        client.close()
 
 
-def test_s3_connection(access_key_id: str, secret_access_key: str, region: str):
-    """Test S3 connection by listing buckets."""
+# STS errors meaning the key pair itself was rejected
+_INVALID_CREDENTIAL_CODES = {"InvalidClientTokenId", "SignatureDoesNotMatch"}
+
+
+def test_s3_connection(access_key_id: str, secret_access_key: str, region: str, bucket: Optional[str] = None):
+    """Test S3 credentials with a single small signed request.
+
+    HEADs the bucket when one is given; otherwise asks STS who the caller is, which
+    needs no IAM permission (unlike an account-wide ListBuckets).
+    """
     try:
-        s3_client = get_s3_client(access_key_id, secret_access_key, region)
-        # Test by listing buckets - this validates credentials
-        s3_client.list_buckets()
+        if bucket:
+            get_s3_client(access_key_id, secret_access_key, region).head_bucket(Bucket=bucket)
+            return
+        with _session_lock:
+            sts_client = _session.client(
+                'sts',
+                aws_access_key_id=access_key_id,
+                aws_secret_access_key=secret_access_key,
+                region_name=region,
+                config=_CLIENT_CONFIG
+            )
+        try:
+            sts_client.get_caller_identity()
+        finally:
+            sts_client.close()
     except ClientError as e:
+        if not bucket and e.response.get('Error', {}).get('Code') in _INVALID_CREDENTIAL_CODES:
+            raise Exception("Invalid AWS credentials")
         raise Exception(f"S3 connection failed: {str(e)}")
     except NoCredentialsError:
         raise Exception("Invalid AWS credentials")
@@ -38,37 +110,112 @@ def list_buckets(access_key_id: str, secret_access_key: str, region: str = "us-e
         raise Exception("Invalid AWS credentials")
 
 
-def list_s3_files(access_key_id: str, secret_access_key: str, bucket: str, prefix: str = "", region: str = "us-east-1") -> List[Dict]:
-    """List files in S3 bucket with optional prefix."""
+def _file_entry(obj: Dict) -> Dict:
+    return {
+        "key": obj['Key'],
+        "size": obj['Size'],
+        "last_modified": obj['LastModified'].isoformat()
+    }
+
+
+def iter_s3_files(access_key_id: str, secret_access_key: str, bucket: str, prefix: str = "", region: str = "us-east-1") -> Iterator[Dict]:
+    """Yield files under prefix in key order, one ListObjectsV2 page at a time.
+
+    Memory stays flat however many keys match, and the first entries are available as
+    soon as the first page arrives. Errors surface on the first next() for bad
+    credentials or buckets, or mid-stream.
+    """
     s3_client = get_s3_client(access_key_id, secret_access_key, region)
-    
+    paginator = s3_client.get_paginator('list_objects_v2')
     try:
-        response = s3_client.list_objects_v2(Bucket=bucket, Prefix=prefix)
-        files = []
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                files.append({
-                    "key": obj['Key'],
-                    "size": obj['Size'],
-                    "last_modified": obj['LastModified'].isoformat()
-                })
-        return files
+        pages = paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': 1000})
+        for obj in pages.search('Contents[]'):
+            if obj is not None:
+                yield _file_entry(obj)
     except ClientError as e:
         raise Exception(f"Failed to list S3 files: {str(e)}")
 
 
+# Preview reads a prefix of the object, doubling the range until enough lines are in it
+_PREVIEW_RANGE_START = 64 * 1024
+_PREVIEW_RANGE_CAP = 8 * 1024 * 1024
+
+
 def preview_s3_file(access_key_id: str, secret_access_key: str, bucket: str, key: str, region: str = "us-east-1", lines: int = 10) -> List[str]:
-    """Preview first N lines of an S3 file."""
+    """Preview first N lines of an S3 file (decompressing .gz files on the fly)."""
+    return read_s3_lines(access_key_id, secret_access_key, bucket, key, region, lines)[0]
+
+
+def read_s3_lines(access_key_id: str, secret_access_key: str, bucket: str, key: str, region: str = "us-east-1", lines: int = 10) -> Tuple[List[str], bool]:
+    """First N lines of an S3 file, and whether they are the whole file (blank tail aside)."""
     s3_client = get_s3_client(access_key_id, secret_access_key, region)
     
+    gzipped = key.lower().endswith('.gz')
+    
     try:
-        response = s3_client.get_object(Bucket=bucket, Key=key)
-        content = response['Body'].read().decode('utf-8')
-        return content.split('\n')[:lines]
-    except ClientError as e:
+        range_size = _PREVIEW_RANGE_START
+        while True:
+            try:
+                response = s3_client.get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{range_size - 1}")
+            except ClientError as e:
+                # An empty object has no satisfiable byte range
+                if e.response.get('Error', {}).get('Code') == 'InvalidRange':
+                    return [], True
+                raise
+            data = response['Body'].read()
+            # "bytes 0-65535/<total>"; absent if the server ignored Range and sent everything
+            content_range = response.get('ContentRange')
+            at_eof = content_range is None or len(data) >= int(content_range.rsplit('/', 1)[1])
+            if gzipped:
+                # A gzip prefix inflates to a prefix of the content; cap the output so a
+                # highly compressible file can't balloon in memory
+                data = zlib.decompressobj(zlib.MAX_WBITS | 16).decompress(data, _PREVIEW_RANGE_CAP)
+                at_eof = at_eof and len(data) < _PREVIEW_RANGE_CAP
+            if at_eof or data.count(b'\n') >= lines or range_size >= _PREVIEW_RANGE_CAP:
+                break
+            range_size *= 2
+        
+        if not at_eof:
+            # Drop the trailing line the range cut off (it may also split a UTF-8 character)
+            cut = data.rfind(b'\n')
+            if cut >= 0:
+                data = data[:cut]
+        # Split off just the first N lines and decode only those
+        parts = data.split(b'\n', lines)
+        complete = at_eof and (len(parts) <= lines or not parts[lines].strip())
+        return [line.decode('utf-8') for line in parts[:lines]], complete
+    except (ClientError, zlib.error) as e:
         raise Exception(f"Failed to preview S3 file: {str(e)}")
 
 
+# Sections of a bucket notification configuration that a PUT must carry over
+_NOTIFICATION_CONFIG_KEYS = (
+    'TopicConfigurations',
+    'QueueConfigurations',
+    'LambdaFunctionConfigurations',
+    'EventBridgeConfiguration',
+)
+
+# bucket -> lock serialising notification read-modify-writes within this process
+_notification_locks: Dict[str, threading.Lock] = {}
+_notification_locks_guard = threading.Lock()
+
+
+def _notification_lock(bucket: str) -> threading.Lock:
+    with _notification_locks_guard:
+        return _notification_locks.setdefault(bucket, threading.Lock())
+
+
+def _queue_config_signature(queue_config: Dict) -> tuple:
+    """(QueueArn, filter rules, events) of a queue configuration; S3 returns rule names capitalised."""
+    rules = queue_config.get('Filter', {}).get('Key', {}).get('FilterRules', ())
+    return (
+        queue_config.get('QueueArn'),
+        frozenset((rule['Name'].lower(), rule['Value']) for rule in rules),
+        frozenset(queue_config.get('Events', ())),
+    )
+
+
 def create_s3_event_notification(
     access_key_id: str,
     secret_access_key: str,
@@ -100,51 +247,41 @@ def create_s3_event_notification(
         
         # Create event notification configuration
         # Snowpipe expects events on object creation
-        notification_config = {
-            'QueueConfigurations': [
-                {
-                    'QueueArn': sqs_arn,
-                    'Events': ['s3:ObjectCreated:*'],  # Trigger on any object creation
-                    'Filter': {
-                        'Key': {
-                            'FilterRules': [
-                                {
-                                    'Name': 'prefix',
-                                    'Value': normalized_prefix
-                                }
-                            ]
+        queue_config = {
+            'QueueArn': sqs_arn,
+            'Events': ['s3:ObjectCreated:*'],  # Trigger on any object creation
+            'Filter': {
+                'Key': {
+                    'FilterRules': [
+                        {
+                            'Name': 'prefix',
+                            'Value': normalized_prefix
                         }
-                    }
+                    ]
                 }
-            ]
+            }
         }
         
-        # Get existing notification configuration
-        try:
+        # The configuration is replaced as a whole, so read-modify-write it under the bucket's lock
+        with _notification_lock(bucket):
             existing_config = s3_client.get_bucket_notification_configuration(Bucket=bucket)
-            
-            # Merge with existing queue configurations
             existing_queues = existing_config.get('QueueConfigurations', [])
-            # Check if this SQS ARN already exists
-            for queue_config in existing_queues:
-                if queue_config.get('QueueArn') == sqs_arn:
-                    # Update existing configuration
-                    notification_config['QueueConfigurations'] = existing_queues
-                    break
-            else:
-                # Add new queue configuration
-                notification_config['QueueConfigurations'] = existing_queues + notification_config['QueueConfigurations']
-        except ClientError:
-            # No existing configuration, use new one
-            pass
-        
-        # Put the notification configuration
-        s3_client.put_bucket_notification_configuration(
-            Bucket=bucket,
-            NotificationConfiguration=notification_config
-        )
+            
+            # Re-registering the same queue, prefix and events is a no-op: skip the PUT
+            if _queue_config_signature(queue_config) in {_queue_config_signature(q) for q in existing_queues}:
+                return f"Event notification already configured for prefix: {normalized_prefix}"
+            
+            # Keep every other notification (topics, lambdas, EventBridge, other queues/prefixes)
+            notification_config = {
+                key: value for key, value in existing_config.items() if key in _NOTIFICATION_CONFIG_KEYS
+            }
+            notification_config['QueueConfigurations'] = existing_queues + [queue_config]
+            
+            s3_client.put_bucket_notification_configuration(
+                Bucket=bucket,
+                NotificationConfiguration=notification_config
+            )
         
         return f"Event notification created for prefix: {normalized_prefix}"
     except ClientError as e:
         raise Exception(f"Failed to create S3 event notification: {str(e)}")
-
@@ -0,0 +1,142 @@
+"""Keyed pool of authenticated Snowflake connections.
+
+Opening a Snowflake connection costs a login round trip (often hundreds of ms),
+so idle connections are kept per credential set and handed out again.
+"""
+import atexit
+import hashlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+import orjson
+
+MAX_IDLE_PER_KEY = 8
+MAX_IDLE_TOTAL = 64  # Across all keys; the least recently released connection is evicted past it
+IDLE_TIMEOUT_SECONDS = 300  # Well under Snowflake's session idle expiry
+MAX_LIFETIME_SECONDS = 3600  # Recycle before the session's 4-hour token lifetime runs out
+SWEEP_INTERVAL_SECONDS = 30  # How often acquire/release also expire idle connections of other keys
+
+# key -> stack of (connection, created_at, released_at); most recently released is reused first.
+# Keys with no idle connections are removed, so abandoned credentials don't accumulate.
+_idle: Dict[str, Deque[Tuple[Any, float, float]]] = {}
+_lock = threading.Lock()
+_next_sweep = 0.0
+
+
+def connection_key(**connection_params: Any) -> str:
+    """Build a pool key from connection parameters without keeping secrets in it."""
+    payload = orjson.dumps(connection_params, option=orjson.OPT_SORT_KEYS, default=str)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def _close_quietly(conn) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _is_fresh(created_at: float, released_at: float, now: float) -> bool:
+    return now - released_at < IDLE_TIMEOUT_SECONDS and now - created_at < MAX_LIFETIME_SECONDS
+
+
+def _sweep_locked(now: float) -> List[Any]:
+    """Drop expired idle connections of every key (at most once per sweep interval).
+
+    Caller holds _lock; returns the connections to close once it is released.
+    """
+    global _next_sweep
+    if now < _next_sweep:
+        return []
+    _next_sweep = now + SWEEP_INTERVAL_SECONDS
+    expired = []
+    for key in list(_idle):
+        idle = _idle[key]
+        fresh = [entry for entry in idle if _is_fresh(entry[1], entry[2], now)]
+        if len(fresh) < len(idle):
+            expired.extend(entry[0] for entry in idle if not _is_fresh(entry[1], entry[2], now))
+            idle.clear()
+            idle.extend(fresh)
+        if not idle:
+            del _idle[key]
+    return expired
+
+
+def _evict_oldest_locked() -> Any:
+    """Remove and return the least recently released idle connection of any key. Caller holds _lock."""
+    key = min(_idle, key=lambda k: _idle[k][0][2])
+    idle = _idle[key]
+    conn = idle.popleft()[0]
+    if not idle:
+        del _idle[key]
+    return conn
+
+
+def _acquire(key: str) -> Tuple[Any, float]:
+    """Pop a live idle connection and its creation time for key, discarding expired ones."""
+    now = time.monotonic()
+    conn, created_at = None, now
+    with _lock:
+        stale = _sweep_locked(now)
+        idle = _idle.get(key)
+        while idle:
+            candidate, candidate_created_at, released_at = idle.pop()
+            if _is_fresh(candidate_created_at, released_at, now) and not candidate.is_closed():
+                conn, created_at = candidate, candidate_created_at
+                break
+            stale.append(candidate)
+        if idle is not None and not idle:
+            del _idle[key]
+    for candidate in stale:
+        _close_quietly(candidate)
+    return conn, created_at
+
+
+def _release(key: str, conn, created_at: float) -> None:
+    """Return a connection to the pool, closing it if the pool is full or it is due for recycling."""
+    now = time.monotonic()
+    to_close = [conn]
+    if now - created_at < MAX_LIFETIME_SECONDS:
+        with _lock:
+            to_close = _sweep_locked(now)
+            idle = _idle.get(key)
+            if idle is not None and len(idle) >= MAX_IDLE_PER_KEY:
+                to_close.append(conn)
+            else:
+                if sum(map(len, _idle.values())) >= MAX_IDLE_TOTAL:
+                    to_close.append(_evict_oldest_locked())
+                _idle.setdefault(key, deque()).append((conn, created_at, now))
+    for stale in to_close:
+        _close_quietly(stale)
+
+
+@contextmanager
+def borrow(key: str, factory: Callable[[], Any]):
+    """Borrow a pooled connection for key, creating one with factory if none is idle.
+
+    Connections that raise while borrowed are closed rather than returned.
+    """
+    conn, created_at = _acquire(key)
+    if conn is None:
+        conn = factory()
+    try:
+        yield conn
+    except BaseException:
+        _close_quietly(conn)
+        raise
+    _release(key, conn, created_at)
+
+
+def close_all() -> None:
+    """Close every idle pooled connection; runs at interpreter exit to log sessions out."""
+    with _lock:
+        idle_connections = [conn for idle in _idle.values() for conn, _, _ in idle]
+        _idle.clear()
+    for conn in idle_connections:
+        _close_quietly(conn)
+
+
+atexit.register(close_all)
@@ -1,5 +1,10 @@
+import re
 import snowflake.connector
-from typing import Dict, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Dict, Optional, List
+from app.core.config import settings
+from app.services.snowflake_pool import MAX_IDLE_PER_KEY, borrow, connection_key
 
 
 def get_snowflake_connection(account: str, user: str, password: str, warehouse: Optional[str] = None, database: Optional[str] = None, schema: Optional[str] = None, role: Optional[str] = None):
@@ -7,7 +12,11 @@ def get_snowflake_connection(account: str, user: str, password: str, warehouse:
     connection_params = {
         "user": user,
         "password": password,
-        "account": account
+        "account": account,
+        "client_prefetch_threads": settings.SNOWFLAKE_CLIENT_PREFETCH_THREADS,
+        "client_session_keep_alive": settings.SNOWFLAKE_SESSION_KEEP_ALIVE,
+        "client_store_temporary_credential": settings.SNOWFLAKE_STORE_TEMPORARY_CREDENTIAL,
+        "session_parameters": {"QUERY_TAG": settings.SNOWFLAKE_QUERY_TAG}
     }
     if warehouse:
         connection_params["warehouse"] = warehouse
@@ -20,11 +29,36 @@ def get_snowflake_connection(account: str, user: str, password: str, warehouse:
     return snowflake.connector.connect(**connection_params)
 
 
+@contextmanager
+def pooled_snowflake_connection(account: str, user: str, password: str, warehouse: Optional[str] = None, database: Optional[str] = None, schema: Optional[str] = None, role: Optional[str] = None):
+    """Borrow a pooled Snowflake connection for these parameters; returned to the pool on exit."""
+    key = connection_key(
+        account=account, user=user, password=password, warehouse=warehouse,
+        database=database, schema=schema, role=role
+    )
+    with borrow(key, lambda: get_snowflake_connection(account, user, password, warehouse, database, schema, role)) as conn:
+        yield conn
+
+
+def pooled_metadata_connection(account: str, user: str, password: str, role: Optional[str] = None):
+    """Borrow a pooled connection with no warehouse, database or schema.
+
+    For SHOW/DESC and DDL, which run in the cloud services layer: without a warehouse in
+    the session nothing can resume one (no resume latency, no compute credits). Shares
+    its pool with pooled_snowflake_connection calls that pass none of the three.
+    """
+    return pooled_snowflake_connection(account, user, password, role=role)
+
+
 def test_snowflake_connection(account: str, user: str, password: str, warehouse: Optional[str] = None, database: Optional[str] = None, schema: Optional[str] = None, role: Optional[str] = None):
-    """Test Snowflake connection."""
+    """Test Snowflake connection.
+
+    Goes through the pool: a warm session for these credentials is checked with a no-op
+    query, and a freshly opened one stays pooled for the browsing calls that follow.
+    """
     try:
-        conn = get_snowflake_connection(account, user, password, warehouse, database, schema, role)
-        conn.close()
+        with pooled_snowflake_connection(account, user, password, warehouse, database, schema, role) as conn:
+            execute_sql(conn, "SELECT 1")
     except Exception as e:
         raise Exception(f"Snowflake connection failed: {str(e)}")
 
@@ -46,17 +80,9 @@ def list_databases(conn) -> List[str]:
     """List all databases available to the current user."""
     cursor = conn.cursor()
     try:
-        cursor.execute("SHOW DATABASES")
-        results = cursor.fetchall()
-        # SHOW DATABASES returns columns: created_on, name, is_default, is_current, origin, owner, comment, options, retention_time
-        # The name is typically at index 1
-        databases = []
-        for row in results:
-            if len(row) > 1:
-                db_name = row[1]  # name column
-                if db_name:  # Filter out None/empty
-                    databases.append(db_name)
-        return databases
+        cursor.execute("SHOW TERSE DATABASES")
+        # SHOW TERSE DATABASES returns columns: created_on, name, kind, database_name, schema_name
+        return [row[1] for row in cursor.fetchall() if row[1]]
     finally:
         cursor.close()
 
@@ -66,33 +92,95 @@ def list_schemas(conn, database: Optional[str] = None) -> List[str]:
     cursor = conn.cursor()
     try:
         if database:
-            cursor.execute(f"SHOW SCHEMAS IN DATABASE {database}")
+            cursor.execute("SHOW SCHEMAS IN DATABASE IDENTIFIER(%(database)s)", {"database": database})
         else:
             cursor.execute("SHOW SCHEMAS")
-        results = cursor.fetchall()
-        # Results format: (created_on, name, ...)
-        # Extract schema names (typically second column, but may vary)
-        schemas = []
-        for row in results:
-            # Find the name column (usually index 1 or 2)
-            if len(row) > 1:
-                # Try to find the name field
-                for i, val in enumerate(row):
-                    if isinstance(val, str) and val.upper() not in ['PUBLIC', 'INFORMATION_SCHEMA'] or i == 1:
-                        if isinstance(val, str):
-                            schemas.append(val)
-                            break
-                else:
-                    # Fallback: use second column
-                    if len(row) > 1:
-                        schemas.append(str(row[1]))
-        return schemas if schemas else [row[1] if len(row) > 1 else str(row[0]) for row in results]
+        # SHOW SCHEMAS returns columns: created_on, name, is_default, ...; the name is always index 1
+        return [row[1] for row in cursor.fetchall() if row[1]]
     finally:
         cursor.close()
 
 
-def create_table_from_schema(conn, database: str, schema: str, table_name: str, columns: List[Dict]):
-    """Create table from column definitions."""
+def list_schemas_multi(connect: Callable[[], ContextManager], databases: List[str]) -> Dict[str, List[str]]:
+    """List schemas for several databases with one SHOW per database, run in parallel.
+
+    Each worker borrows its own connection from connect() (a pooled-connection factory);
+    workers are capped at the per-key pool size so released sessions are all kept for reuse.
+    """
+    def list_one(database: str) -> List[str]:
+        with connect() as conn:
+            return list_schemas(conn, database)
+
+    if not databases:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(MAX_IDLE_PER_KEY, len(databases))) as executor:
+        return dict(zip(databases, executor.map(list_one, databases)))
+
+
+# SHOW commands return at most this many rows
+SHOW_ROW_LIMIT = 10000
+
+
+def list_schemas_by_database(conn) -> Optional[Dict[str, List[str]]]:
+    """List every schema visible to the current user, grouped by database, in one query.
+
+    Returns None when the account-wide listing isn't usable (not permitted, or cut off at
+    SHOW_ROW_LIMIT); callers then fall back to list_schemas per database.
+    """
+    cursor = conn.cursor()
+    try:
+        try:
+            cursor.execute("SHOW TERSE SCHEMAS IN ACCOUNT")
+        except snowflake.connector.errors.ProgrammingError:
+            return None
+        rows = cursor.fetchall()
+        if len(rows) >= SHOW_ROW_LIMIT:
+            return None
+        columns = [col[0].lower() for col in cursor.description]
+        name_idx = columns.index("name")
+        database_idx = columns.index("database_name")
+        schemas_by_database: Dict[str, List[str]] = {}
+        for row in rows:
+            schemas_by_database.setdefault(row[database_idx], []).append(row[name_idx])
+        return schemas_by_database
+    finally:
+        cursor.close()
+
+
+# SHOW PIPES columns returned by list_pipes
+_PIPE_COLUMNS = ("name", "definition", "notification_channel", "comment")
+
+
+def list_pipes(conn, database: str, schema: str) -> List[Dict[str, Optional[str]]]:
+    """List the pipes in a schema.
+
+    SHOW runs without a warehouse, unlike a query on INFORMATION_SCHEMA.PIPES; for one
+    known pipe, DESC PIPE (see get_snowpipe_sqs_arn) is cheaper still.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SHOW PIPES IN SCHEMA IDENTIFIER(%(schema)s)", {"schema": f"{database}.{schema}"})
+        rows = cursor.fetchall()
+        columns = {desc[0].lower(): i for i, desc in enumerate(cursor.description or ())}
+        indices = [(column, columns[column]) for column in _PIPE_COLUMNS if column in columns]
+        return [{column: row[i] for column, i in indices} for row in rows]
+    finally:
+        cursor.close()
+
+
+def execute_multi(conn, sqls: List[str], params: Optional[Dict] = None):
+    """Execute several statements in one multi-statement request (a single round trip)."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(";\n".join(sqls), params, num_statements=len(sqls))
+        # Walk every statement's result so a failure in any of them is raised here
+        while cursor.nextset():
+            pass
+    finally:
+        cursor.close()
+
+
+def _create_table_sql(database: str, schema: str, table_name: str, columns: List[Dict]) -> str:
     # Build CREATE TABLE statement
     column_defs = []
     for col in columns:
@@ -106,31 +194,41 @@ def create_table_from_schema(conn, database: str, schema: str, table_name: str,
         {', '.join(column_defs)}
     )
     """
-    
-    execute_sql(conn, create_sql)
+    return create_sql
 
 
-def create_external_stage(conn, database: str, schema: str, stage_name: str, s3_url: str, aws_credentials: Dict):
-    """Create external stage pointing to S3."""
+def create_table_from_schema(conn, database: str, schema: str, table_name: str, columns: List[Dict]):
+    """Create table from column definitions."""
+    execute_sql(conn, _create_table_sql(database, schema, table_name, columns))
+
+
+def _create_stage_sql(database: str, schema: str, stage_name: str) -> str:
+    # URL and keys are bound (see _stage_params), so they are escaped by the connector
     create_sql = f"""
     CREATE OR REPLACE STAGE {database}.{schema}.{stage_name}
-    URL = '{s3_url}'
-    CREDENTIALS = (AWS_KEY_ID = '{aws_credentials['access_key_id']}' AWS_SECRET_KEY = '{aws_credentials['secret_access_key']}')
+    URL = %(stage_url)s
+    CREDENTIALS = (AWS_KEY_ID = %(aws_key_id)s AWS_SECRET_KEY = %(aws_secret_key)s)
     """
-    
-    execute_sql(conn, create_sql)
+    return create_sql
+
+
+def _stage_params(s3_url: str, aws_credentials: Dict) -> Dict[str, str]:
+    return {
+        "stage_url": s3_url,
+        "aws_key_id": aws_credentials['access_key_id'],
+        "aws_secret_key": aws_credentials['secret_access_key'],
+    }
+
+
+def create_external_stage(conn, database: str, schema: str, stage_name: str, s3_url: str, aws_credentials: Dict):
+    """Create external stage pointing to S3."""
+    execute_sql(conn, _create_stage_sql(database, schema, stage_name), _stage_params(s3_url, aws_credentials))
     return stage_name
 
 
-def create_snowpipe(conn, database: str, schema: str, pipe_name: str, stage_name: str, table_name: str, file_format: str = "JSON", copy_options: Optional[Dict] = None):
-    """Create Snowpipe for continuous ingestion with AUTO_INGEST enabled."""
-    # Build FILE_FORMAT options
-    file_format_options = build_file_format_options(file_format, copy_options)
-    
-    # Build COPY INTO statement based on format type
-    if file_format.upper() == "JSON":
-        # For JSON, map to VARIANT column and include metadata
-        copy_sql = f"""COPY INTO {database}.{schema}.{table_name} (raw_data, metadata_filename, metadata_file_row_number, metadata_file_content_key, metadata_file_last_modified)
+# COPY INTO ... FROM stage, by format. JSON maps each document to the VARIANT column and
+# adds file metadata; other formats copy straight into the table's columns.
+_COPY_JSON_TMPL = """COPY INTO {table} (raw_data, metadata_filename, metadata_file_row_number, metadata_file_content_key, metadata_file_last_modified)
 FROM (
     SELECT 
         $1::VARIANT AS raw_data,
@@ -138,14 +236,24 @@ FROM (
         METADATA$FILE_ROW_NUMBER AS metadata_file_row_number,
         METADATA$FILE_CONTENT_KEY AS metadata_file_content_key,
         METADATA$FILE_LAST_MODIFIED AS metadata_file_last_modified
-    FROM @{database}.{schema}.{stage_name}
-)
-FILE_FORMAT = ({file_format_options})"""
-    else:
-        # For other formats (future support)
-        copy_sql = f"""COPY INTO {database}.{schema}.{table_name}
-FROM @{database}.{schema}.{stage_name}
-FILE_FORMAT = ({file_format_options})"""
+    FROM @{stage}
+)"""
+_COPY_TMPL = """COPY INTO {table}
+FROM @{stage}"""
+
+
+def _copy_source_sql(database: str, schema: str, table_name: str, stage_name: str, file_format: str) -> str:
+    template = _COPY_JSON_TMPL if file_format.upper() == "JSON" else _COPY_TMPL
+    return template.format(table=f"{database}.{schema}.{table_name}", stage=f"{database}.{schema}.{stage_name}")
+
+
+def _create_snowpipe_sql(database: str, schema: str, pipe_name: str, stage_name: str, table_name: str, file_format: str = "JSON", copy_options: Optional[Dict] = None) -> str:
+    # Build FILE_FORMAT options
+    file_format_options = build_file_format_options(file_format, copy_options)
+    
+    # Build COPY INTO statement based on format type
+    copy_sql = _copy_source_sql(database, schema, table_name, stage_name, file_format) + f"""
+FILE_FORMAT = ({file_format_options}){_on_error_sql(copy_options)}"""
     
     create_sql = f"""
     CREATE OR REPLACE PIPE {database}.{schema}.{pipe_name}
@@ -153,188 +261,181 @@ FILE_FORMAT = ({file_format_options})"""
     AS
     {copy_sql}
     """
-    
-    execute_sql(conn, create_sql)
+    return create_sql
+
+
+def create_snowpipe(conn, database: str, schema: str, pipe_name: str, stage_name: str, table_name: str, file_format: str = "JSON", copy_options: Optional[Dict] = None):
+    """Create Snowpipe for continuous ingestion with AUTO_INGEST enabled."""
+    execute_sql(conn, _create_snowpipe_sql(database, schema, pipe_name, stage_name, table_name, file_format, copy_options))
     return pipe_name
 
 
+def provision_pipeline(
+    conn,
+    database: str,
+    schema: str,
+    table_name: str,
+    columns: List[Dict],
+    stage_name: str,
+    s3_url: str,
+    aws_credentials: Dict,
+    pipe_name: Optional[str] = None,
+    file_format: str = "JSON",
+    copy_options: Optional[Dict] = None
+):
+    """Create the target table, the external stage and (if pipe_name is given) the pipe in one round trip."""
+    # The request carries bound stage parameters, so a literal '%' elsewhere (e.g. a
+    # delimiter option) must be doubled to survive pyformat interpolation
+    sqls = [
+        _create_table_sql(database, schema, table_name, columns).replace("%", "%%"),
+        _create_stage_sql(database, schema, stage_name),
+    ]
+    if pipe_name:
+        sqls.append(_create_snowpipe_sql(
+            database, schema, pipe_name, stage_name, table_name, file_format, copy_options
+        ).replace("%", "%%"))
+    execute_multi(conn, sqls, _stage_params(s3_url, aws_credentials))
+
+
 def get_snowpipe_sqs_arn(conn, database: str, schema: str, pipe_name: str) -> str:
-    """Get SQS ARN from Snowpipe using DESCRIBE PIPE."""
+    """Get SQS ARN from Snowpipe using DESCRIBE PIPE (its notification_channel column)."""
     cursor = conn.cursor()
     try:
-        describe_sql = f"DESC PIPE {database}.{schema}.{pipe_name}"
-        cursor.execute(describe_sql)
-        result = cursor.fetchall()
-        
-        # DESCRIBE PIPE returns a result set with columns
-        # The exact format may vary, but typically includes property names and values
-        # Look for notification-related properties
-        
-        # First, let's check what columns we have
-        column_names = [desc[0] for desc in cursor.description] if cursor.description else []
-        
-        # Try to find the notification channel/SQS ARN
-        # It might be in different columns depending on Snowflake version
-        for row in result:
-            # Check all columns for SQS ARN patterns (arn:aws:sqs:)
-            for i, value in enumerate(row):
-                if value and isinstance(value, str):
-                    value_str = str(value).strip()
-                    # Look for SQS ARN pattern
-                    if value_str.startswith("arn:aws:sqs:") or "sqs" in value_str.lower():
-                        return value_str
-                    # Also check if this column name suggests it's the notification channel
-                    if i < len(column_names):
-                        col_name = str(column_names[i]).upper()
-                        if "NOTIFICATION" in col_name or "CHANNEL" in col_name or "SQS" in col_name:
-                            if value_str:
-                                return value_str
-            
-            # Also check if row[0] is a property name and row[1] is the value
-            if len(row) >= 2:
-                property_name = str(row[0]).upper() if row[0] else ""
-                property_value = str(row[1]).strip() if row[1] else ""
-                
-                # Check various possible property names
-                if any(keyword in property_name for keyword in ["NOTIFICATION", "CHANNEL", "SQS", "QUEUE"]):
-                    if property_value and (property_value.startswith("arn:aws:sqs:") or "sqs" in property_value.lower()):
-                        return property_value
-                
-                # If property name matches and value exists, return it
-                if property_name in ["NOTIFICATION_CHANNEL", "CHANNEL", "SQS_ARN"] and property_value:
-                    return property_value
-        
-        # If we still haven't found it, raise an error with debug info
-        debug_info = f"Columns: {column_names}, Rows: {len(result)}"
-        raise Exception(f"SQS ARN not found in pipe description. {debug_info}. Pipe may not have AUTO_INGEST enabled or may need a moment to initialize.")
+        cursor.execute(f"DESC PIPE {database}.{schema}.{pipe_name}")
+        row = cursor.fetchone()
+        columns = {desc[0].upper(): i for i, desc in enumerate(cursor.description or ())}
+        channel_idx = columns.get("NOTIFICATION_CHANNEL")
+        sqs_arn = row[channel_idx] if row and channel_idx is not None else None
+        if not sqs_arn:
+            raise Exception("SQS ARN not found in pipe description. Pipe may not have AUTO_INGEST enabled or may need a moment to initialize.")
+        return sqs_arn.strip()
     finally:
         cursor.close()
 
 
+# FILE_FORMAT options used when no copy options are given
+_DEFAULT_CSV_OPTS = "SKIP_HEADER = 1, FIELD_OPTIONALLY_ENCLOSED_BY = '\"', TRIM_SPACE = TRUE"
+_DEFAULT_FORMAT_OPTIONS = {
+    "CSV": f"TYPE = 'CSV', {_DEFAULT_CSV_OPTS}",
+    "JSON": "TYPE = 'JSON'",
+}
+
+
+# Escape sequences accepted in a record_delimiter option. str.translate can't map
+# two-character sequences, so one regex pass substitutes them instead
+_DELIMITER_ESCAPES = {"n": "\n", "r": "\r", "t": "\t"}
+_DELIMITER_ESCAPE_RE = re.compile(r"\\([nrt])")
+
+
+def _unescape_delimiter(value: str) -> str:
+    return _DELIMITER_ESCAPE_RE.sub(lambda m: _DELIMITER_ESCAPES[m.group(1)], value)
+
+
+# Per format: (copy option, default, renderer -> FILE_FORMAT option, or None to omit it)
+_FORMAT_OPTION_SPECS = {
+    "CSV": (
+        ("field_delimiter", None, lambda v: f"FIELD_DELIMITER = '{v}'" if v else None),
+        ("record_delimiter", None, lambda v: f"RECORD_DELIMITER = '{_unescape_delimiter(v)}'" if v else None),
+        ("skip_header", 1, lambda v: f"SKIP_HEADER = {v}"),
+        ("field_optionally_enclosed_by", '"', lambda v: f"FIELD_OPTIONALLY_ENCLOSED_BY = '{v}'"),
+        ("trim_space", True, lambda v: "TRIM_SPACE = TRUE" if v else None),
+        ("error_on_column_count_mismatch", False, lambda v: "ERROR_ON_COLUMN_COUNT_MISMATCH = TRUE" if v else None),
+    ),
+    "JSON": (
+        ("strip_outer_array", False, lambda v: "STRIP_OUTER_ARRAY = TRUE" if v else None),
+        ("replace_invalid_characters", False, lambda v: "REPLACE_INVALID_CHARACTERS = TRUE" if v else None),
+        ("ignore_utf8_errors", False, lambda v: "IGNORE_UTF8_ERRORS = TRUE" if v else None),
+    ),
+}
+
+
 def build_file_format_options(file_format: str, copy_options: Optional[Dict] = None) -> str:
     """Build FILE_FORMAT options string from file format and copy options."""
-    options = []
+    file_format = file_format.upper()
+    if not copy_options:
+        default_options = _DEFAULT_FORMAT_OPTIONS.get(file_format)
+        if default_options is not None:
+            return default_options
+        copy_options = {}
     
     # Always include TYPE
-    options.append(f"TYPE = '{file_format.upper()}'")
-    
-    if file_format.upper() == "CSV":
-        # CSV default options
-        if copy_options:
-            if 'field_delimiter' in copy_options and copy_options['field_delimiter']:
-                options.append(f"FIELD_DELIMITER = '{copy_options['field_delimiter']}'")
-            if 'record_delimiter' in copy_options and copy_options['record_delimiter']:
-                # Handle escape sequences
-                record_delim = copy_options['record_delimiter'].replace('\\n', '\n').replace('\\r', '\r').replace('\\t', '\t')
-                options.append(f"RECORD_DELIMITER = '{record_delim}'")
-            # Skip header - use provided value or default to 1
-            skip_header = copy_options.get('skip_header', 1)
-            options.append(f"SKIP_HEADER = {skip_header}")
-            # Field optionally enclosed by - use provided value or default to double quote
-            field_enclosed = copy_options.get('field_optionally_enclosed_by', '"')
-            options.append(f"FIELD_OPTIONALLY_ENCLOSED_BY = '{field_enclosed}'")
-            # Trim space - default to True if not specified
-            if copy_options.get('trim_space', True):
-                options.append("TRIM_SPACE = TRUE")
-            if copy_options.get('error_on_column_count_mismatch', False):
-                options.append("ERROR_ON_COLUMN_COUNT_MISMATCH = TRUE")
-        else:
-            # Default CSV options
-            options.extend([
-                "SKIP_HEADER = 1",
-                "FIELD_OPTIONALLY_ENCLOSED_BY = '\"'",
-                "TRIM_SPACE = TRUE"
-            ])
-    elif file_format.upper() == "JSON":
-        # JSON options
-        if copy_options:
-            if copy_options.get('strip_outer_array', False):
-                options.append("STRIP_OUTER_ARRAY = TRUE")
-            if copy_options.get('replace_invalid_characters', False):
-                options.append("REPLACE_INVALID_CHARACTERS = TRUE")
-            if copy_options.get('ignore_utf8_errors', False):
-                options.append("IGNORE_UTF8_ERRORS = TRUE")
-    
+    options = [f"TYPE = '{file_format}'"]
+    for key, default, render in _FORMAT_OPTION_SPECS.get(file_format, ()):
+        option = render(copy_options.get(key, default))
+        if option is not None:
+            options.append(option)
     return ", ".join(options)
 
 
+# Statement-level copy options (not FILE_FORMAT). They are written into the SQL, so only
+# the documented values are accepted
+_ON_ERROR_RE = re.compile(r"CONTINUE|SKIP_FILE(_\d+%?)?|ABORT_STATEMENT", re.IGNORECASE)
+_VALIDATION_MODES = {"RETURN_ERRORS", "RETURN_ALL_ERRORS"}
+
+
+def _on_error_sql(copy_options: Optional[Dict]) -> str:
+    """ON_ERROR clause for copy_options['on_error'] ('' when not set)."""
+    on_error = (copy_options or {}).get('on_error')
+    if not on_error:
+        return ""
+    if not _ON_ERROR_RE.fullmatch(on_error):
+        raise Exception(f"Unsupported on_error value: {on_error}")
+    return f"\nON_ERROR = '{on_error.upper()}'"
+
+
+def _validation_mode(copy_options: Optional[Dict], file_format: str) -> Optional[str]:
+    validation_mode = (copy_options or {}).get('validation_mode')
+    if not validation_mode:
+        return None
+    validation_mode = validation_mode.upper()
+    if validation_mode not in _VALIDATION_MODES:
+        raise Exception(f"Unsupported validation_mode: {validation_mode}. Must be one of {', '.join(sorted(_VALIDATION_MODES))}")
+    # The JSON load selects from the stage, and Snowflake can't validate a transforming COPY
+    if file_format.upper() == "JSON":
+        raise Exception("validation_mode is not supported for JSON loads")
+    return validation_mode
+
+
 def copy_into_table(conn, database: str, schema: str, table_name: str, stage_name: str, file_pattern: str, file_format: str = "CSV", copy_options: Optional[Dict] = None):
-    """Execute COPY INTO command for one-time ingestion."""
-    # Use FILES parameter to specify the file pattern
-    # Escape single quotes in file_pattern if present
-    file_pattern_escaped = file_pattern.replace("'", "''")
+    """Execute COPY INTO command for one-time ingestion.
+
+    Besides the FILE_FORMAT options, copy_options may set on_error, purge (default False)
+    and validation_mode (RETURN_ERRORS / RETURN_ALL_ERRORS). With a validation_mode the
+    file is dry-run first, and nothing is loaded if that reports any error.
+    """
+    validation_mode = _validation_mode(copy_options, file_format)
     
-    # Build FILE_FORMAT options
-    file_format_options = build_file_format_options(file_format, copy_options)
+    # FILES names the one file to load, so Snowflake doesn't enumerate the whole stage prefix
+    # (bound, so quotes in the file name are escaped by the connector)
+    # Build FILE_FORMAT options ('%' doubled, as the statement goes through pyformat binding)
+    file_format_options = build_file_format_options(file_format, copy_options).replace("%", "%%")
     
     # Build COPY INTO statement based on format type
-    if file_format.upper() == "CSV":
-        # For CSV, copy directly into columns
-        copy_sql = f"""COPY INTO {database}.{schema}.{table_name}
-FROM @{database}.{schema}.{stage_name}
-FILES = ('{file_pattern_escaped}')
-FILE_FORMAT = ({file_format_options})"""
-    elif file_format.upper() == "JSON":
-        # For JSON, map to VARIANT column and include metadata
-        copy_sql = f"""COPY INTO {database}.{schema}.{table_name} (raw_data, metadata_filename, metadata_file_row_number, metadata_file_content_key, metadata_file_last_modified)
-FROM (
-    SELECT 
-        $1::VARIANT AS raw_data,
-        METADATA$FILENAME AS metadata_filename,
-        METADATA$FILE_ROW_NUMBER AS metadata_file_row_number,
-        METADATA$FILE_CONTENT_KEY AS metadata_file_content_key,
-        METADATA$FILE_LAST_MODIFIED AS metadata_file_last_modified
-    FROM @{database}.{schema}.{stage_name}
-)
-FILES = ('{file_pattern_escaped}')
-FILE_FORMAT = ({file_format_options})"""
-    else:
-        copy_sql = f"""COPY INTO {database}.{schema}.{table_name}
-FROM @{database}.{schema}.{stage_name}
-FILES = ('{file_pattern_escaped}')
+    copy_sql = _copy_source_sql(database, schema, table_name, stage_name, file_format).replace("%", "%%") + f"""
+FILES = (%(file_pattern)s)
 FILE_FORMAT = ({file_format_options})"""
+    params = {"file_pattern": file_pattern}
     
     cursor = conn.cursor()
     try:
-        cursor.execute(copy_sql)
-        # COPY INTO returns status information
-        # The result shows: file, status, rows_parsed, rows_loaded, error_limit, errors_seen, first_error, first_error_line, first_error_character, first_error_column_name
-        result = cursor.fetchall()
-        
-        # Extract rows_loaded from the result
-        # Result format: [(file, status, rows_parsed, rows_loaded, ...), ...]
-        # Index 0: file, 1: status, 2: rows_parsed, 3: rows_loaded
-        rows_loaded = 0
-        if result and len(result) > 0:
-            row = result[0]
-            
-            # Try to get rows_loaded from index 3
-            if len(row) > 3:
-                rows_loaded_value = row[3]
-                # Convert to int, handling both int and string numeric values
-                if isinstance(rows_loaded_value, (int, float)):
-                    rows_loaded = int(rows_loaded_value)
-                elif isinstance(rows_loaded_value, str) and rows_loaded_value.strip().isdigit():
-                    # Only parse if it's a numeric string
-                    rows_loaded = int(rows_loaded_value)
-                else:
-                    # If it's not a number (like 'LOADED'), try rows_parsed at index 2
-                    if len(row) > 2:
-                        rows_parsed_value = row[2]
-                        if isinstance(rows_parsed_value, (int, float)):
-                            rows_loaded = int(rows_parsed_value)
-                        elif isinstance(rows_parsed_value, str) and rows_parsed_value.strip().isdigit():
-                            rows_loaded = int(rows_parsed_value)
-            # Fallback: try rows_parsed if rows_loaded wasn't available
-            elif len(row) > 2:
-                rows_parsed_value = row[2]
-                if isinstance(rows_parsed_value, (int, float)):
-                    rows_loaded = int(rows_parsed_value)
-                elif isinstance(rows_parsed_value, str) and rows_parsed_value.strip().isdigit():
-                    rows_loaded = int(rows_parsed_value)
+        if validation_mode:
+            # Returns one row per error found, and loads nothing
+            cursor.execute(f"{copy_sql}\nVALIDATION_MODE = {validation_mode}", params)
+            errors = cursor.fetchall()
+            if errors:
+                columns = {desc[0].lower(): i for i, desc in enumerate(cursor.description or ())}
+                first_error = errors[0][columns["error"]] if "error" in columns else errors[0]
+                raise Exception(f"COPY validation found {len(errors)} error(s); first: {first_error}")
         
-        # Ensure we always return an integer
-        rows_loaded = int(rows_loaded) if rows_loaded else 0
+        purge = "TRUE" if (copy_options or {}).get('purge', False) else "FALSE"
+        cursor.execute(f"{copy_sql}{_on_error_sql(copy_options).replace('%', '%%')}\nPURGE = {purge}", params)
+        # COPY INTO returns status information, one row per loaded file:
+        # file, status, rows_parsed, rows_loaded, error_limit, errors_seen, first_error, ...
+        # (or a single "0 files processed" message row when there was nothing to load)
+        result = cursor.fetchall()
+        columns = {desc[0].lower(): i for i, desc in enumerate(cursor.description or ())}
+        loaded_idx = columns.get("rows_loaded")
+        rows_loaded = sum(int(row[loaded_idx] or 0) for row in result) if loaded_idx is not None else 0
         
         return {"rows_loaded": rows_loaded, "result": result}
     finally:
@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
-"""Generate encryption key for credential storage."""
+"""Generate encryption key for credential storage.
+
+Only the key goes to stdout, so it can be captured, e.g.
+``echo "ENCRYPTION_KEY=$(python generate_key.py)" >> .env``.
+"""
+import sys
+
 from cryptography.fernet import Fernet
 
 if __name__ == "__main__":
-    key = Fernet.generate_key()
-    print(f"\nGenerated encryption key:")
-    print(f"{key.decode()}\n")
-    print("Add this to your .env file as ENCRYPTION_KEY")
-
+    print("Generated encryption key (add it to your .env file as ENCRYPTION_KEY):", file=sys.stderr)
+    # generate_key() already returns URL-safe base64 bytes; write them as-is
+    sys.stdout.buffer.write(Fernet.generate_key() + b"\n")
@@ -38,6 +38,7 @@ export default function CreatePipeline() {
   const [copyOptions, setCopyOptions] = useState<Record<string, any>>({})
   const [databases, setDatabases] = useState<string[]>([])
   const [schemas, setSchemas] = useState<string[]>([])
+  const [schemasByDatabase, setSchemasByDatabase] = useState<Record<string, string[]>>({})
   const [loadingDatabases, setLoadingDatabases] = useState(false)
   const [loadingSchemas, setLoadingSchemas] = useState(false)
 
@@ -99,11 +100,14 @@ export default function CreatePipeline() {
     if (!selectedSnowflakeConnection) return
     setLoadingDatabases(true)
     try {
-      const response = await connectionsApi.getDatabases(selectedSnowflakeConnection)
+      // One call returns databases with their schemas, so picking a database needs no request
+      const response = await connectionsApi.browse(selectedSnowflakeConnection)
       setDatabases(response.databases || [])
+      setSchemasByDatabase(response.schemas || {})
     } catch (error) {
       console.error('Failed to load databases:', error)
       setDatabases([])
+      setSchemasByDatabase({})
     } finally {
       setLoadingDatabases(false)
     }
@@ -111,6 +115,10 @@ export default function CreatePipeline() {
 
   const loadSchemas = async (database: string) => {
     if (!selectedSnowflakeConnection || !database) return
+    if (schemasByDatabase[database]) {
+      setSchemas(schemasByDatabase[database])
+      return
+    }
     setLoadingSchemas(true)
     try {
       const response = await connectionsApi.getSchemas(selectedSnowflakeConnection, database)
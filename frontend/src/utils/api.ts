@@ -42,6 +42,26 @@ export async function apiRequest<T>(
   return response.json()
 }
 
+// Follows X-Next-Cursor headers from keyset-paginated list endpoints and concatenates the pages
+async function fetchAllPages<T>(endpoint: string, params: URLSearchParams): Promise<T[]> {
+  const items: T[] = []
+  let cursor: string | null = null
+  do {
+    if (cursor) params.set('cursor', cursor)
+    const query = params.toString()
+    const response = await fetch(`${API_URL}${endpoint}${query ? '?' + query : ''}`, {
+      headers: await getAuthHeaders(),
+    })
+    if (!response.ok) {
+      const error = await response.json().catch(() => ({ detail: 'An error occurred' }))
+      throw new Error(error.detail || `HTTP error! status: ${response.status}`)
+    }
+    items.push(...(await response.json()))
+    cursor = response.headers.get('X-Next-Cursor')
+  } while (cursor)
+  return items
+}
+
 export interface ConnectionDetail extends Connection {
   credentials: Record<string, any>
 }
@@ -80,6 +100,7 @@ export const connectionsApi = {
     const params = database ? '?database=' + encodeURIComponent(database) : ''
     return apiRequest<{ schemas: string[] }>('/api/connections/' + connectionId + '/schemas' + params)
   },
+  browse: (connectionId: number) => apiRequest<{ databases: string[]; schemas: Record<string, string[]> }>('/api/connections/' + connectionId + '/browse'),
   getBuckets: (connectionId: number) => apiRequest<{ buckets: string[] }>('/api/connections/' + connectionId + '/buckets'),
 }
 
@@ -285,8 +306,7 @@ export const contractsApi = {
     if (filters?.department) params.append('department', filters.department)
     if (filters?.project_name) params.append('project_name', filters.project_name)
     if (filters?.source) params.append('source', filters.source)
-    const query = params.toString()
-    return apiRequest<Contract[]>(`/api/contracts${query ? '?' + query : ''}`)
+    return fetchAllPages<Contract>('/api/contracts', params)
   },
   get: (id: number) => apiRequest<Contract>(`/api/contracts/${id}`),
   create: (data: ContractCreateData) => apiRequest<Contract>('/api/contracts', {